@@ -1,7 +1,18 @@
 """Application configuration"""
-from pydantic_settings import BaseSettings
-from typing import List
+from functools import lru_cache
+from pydantic import PrivateAttr
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import FrozenSet, List, Optional, Tuple
+import logging
 import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# URL schemes rewritten to the asyncpg driver
+_POSTGRES_PREFIXES = ("postgresql://", "postgres://")
+_ASYNCPG_PREFIX = "postgresql+asyncpg://"
+_SSLMODE_RE = re.compile(r"\bsslmode=")
 
 
 class Settings(BaseSettings):
@@ -9,27 +20,47 @@ class Settings(BaseSettings):
 
     # Anthropic API Configuration
     anthropic_api_key: str
+    claude_max_concurrency: int = 5  # Max in-flight Claude requests per process
+    claude_max_retries: int = 3  # SDK retries (exponential backoff) on 429/overloaded/5xx
+    claude_use_batches: bool = False  # Send background analyses through the Message Batches API (50% cheaper, slower)
+    claude_batch_window_seconds: float = 2.0  # How long queued analyses wait to be grouped into one batch
+    claude_use_files_api: bool = False  # Upload images once via the Files API (beta) and send file ids instead of base64
 
     # Database Configuration
     database_url: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./golf_coach.db")
+    db_pool_size: Optional[int] = None  # Postgres pool size (default: 1 on serverless, cores * 2 + 1 otherwise)
+    db_max_overflow: Optional[int] = None  # Extra connections beyond the pool (default: 0 on serverless, 10 otherwise)
+
+    # Parsed CORS origins, computed once in __init__
+    _cors_origins: Tuple[str, ...] = PrivateAttr(default=())
+
+    # Allowed image MIME types as a set for O(1) membership checks, computed once in __init__
+    _allowed_formats: FrozenSet[str] = PrivateAttr(default=frozenset())
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        # Convert Neon Postgres URL to use asyncpg driver for async support
-        if self.database_url.startswith("postgresql://"):
-            self.database_url = self.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-        elif self.database_url.startswith("postgres://"):
-            self.database_url = self.database_url.replace("postgres://", "postgresql+asyncpg://", 1)
+        url = self.database_url
+        if url.startswith("postgres"):
+            # Convert Neon Postgres URL to use asyncpg driver for async support
+            if url.startswith(_POSTGRES_PREFIXES):
+                url = _ASYNCPG_PREFIX + url.split("://", 1)[1]
+
+            # Fix SSL mode for asyncpg - replace ?sslmode=require with ?ssl=require
+            if url.startswith(_ASYNCPG_PREFIX):
+                url = _SSLMODE_RE.sub("ssl=", url)
 
-        # Fix SSL mode for asyncpg - replace ?sslmode=require with ?ssl=require
-        if "postgresql+asyncpg://" in self.database_url and "sslmode=" in self.database_url:
-            self.database_url = self.database_url.replace("sslmode=", "ssl=")
+            self.database_url = url
 
         # Log database configuration (with sanitized URL)
-        db_type = 'Postgres' if 'postgresql' in self.database_url else 'SQLite'
-        sanitized_url = self.database_url.split('@')[-1] if '@' in self.database_url else self.database_url[:50]
-        print(f"Database type: {db_type}")
-        print(f"Connecting to: ...{sanitized_url}")
+        if logger.isEnabledFor(logging.DEBUG):
+            db_type = 'Postgres' if 'postgresql' in url else 'SQLite'
+            sanitized_url = url.split('@')[-1] if '@' in url else url[:50]
+            logger.debug(f"Database type: {db_type}")
+            logger.debug(f"Connecting to: ...{sanitized_url}")
+
+        # Parse CORS origins once instead of on every access
+        self._cors_origins = tuple(origin.strip() for origin in self.allowed_origins.split(","))
+        self._allowed_formats = frozenset(self.allowed_image_formats)
 
     # API Configuration
     api_host: str = "0.0.0.0"
@@ -40,18 +71,27 @@ class Settings(BaseSettings):
     allowed_origins: str = "http://localhost:3000,http://localhost:5173,http://127.0.0.1:3000,https://golf-coach-frontend.vercel.app,https://frontend-gilt-two-85.vercel.app"
 
     @property
-    def cors_origins(self) -> List[str]:
-        """Parse comma-separated origins into a list"""
-        return [origin.strip() for origin in self.allowed_origins.split(",")]
+    def cors_origins(self) -> Tuple[str, ...]:
+        """Comma-separated origins parsed into a tuple"""
+        return self._cors_origins
 
     # Image Configuration
     max_image_size_mb: int = 5
     allowed_image_formats: List[str] = ["image/jpeg", "image/png", "image/jpg"]
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    @property
+    def allowed_formats(self) -> FrozenSet[str]:
+        """Allowed image MIME types as a frozenset"""
+        return self._allowed_formats
+
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings instance, parsing the environment only once"""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
@@ -1,7 +1,12 @@
 """Database configuration and session management"""
+import os
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
-from app.config import settings
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import get_settings
+
+settings = get_settings()
 
 # Create async engine with serverless-optimized settings
 # For Vercel/serverless environments, we need:
@@ -11,16 +16,47 @@ from app.config import settings
 engine_kwargs = {
     "echo": settings.debug_mode,
     "pool_pre_ping": True,  # Test connection before use - critical for serverless
-    "pool_recycle": 300,    # Recycle connections after 5 minutes
+    "pool_recycle": 300,    # Recycle connections after 5 minutes (Postgres overrides this below)
+    "query_cache_size": 2400,  # Larger compiled-statement cache
 }
 
+# Detect serverless runtimes (Vercel, AWS Lambda) where each instance is short-lived
+is_serverless = bool(os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
 # Add connect_args for sqlite compatibility
 if "sqlite" in settings.database_url:
     engine_kwargs["connect_args"] = {"check_same_thread": False}
 else:
-    # For PostgreSQL in serverless, use smaller pool
-    engine_kwargs["pool_size"] = 5
-    engine_kwargs["max_overflow"] = 10
+    # pool_pre_ping already detects stale connections, so recycle every 30 minutes
+    # rather than every 5 to avoid needless TLS handshakes on warm instances
+    engine_kwargs["poolclass"] = AsyncAdaptedQueuePool
+    engine_kwargs["pool_recycle"] = 1800
+
+    if is_serverless:
+        # Each serverless instance holds exactly one connection so that horizontal
+        # scale-out doesn't exhaust the Postgres max_connections cap
+        engine_kwargs["pool_size"] = 1
+        engine_kwargs["max_overflow"] = 0
+        engine_kwargs["pool_timeout"] = 5  # Overlapping requests wait briefly for the connection
+    else:
+        # Long-lived server: size the pool from available cores (cores * 2 + 1)
+        engine_kwargs["pool_size"] = (os.cpu_count() or 2) * 2 + 1
+        engine_kwargs["max_overflow"] = 10
+
+    # Explicit DB_POOL_SIZE / DB_MAX_OVERFLOW override the defaults above
+    if settings.db_pool_size is not None:
+        engine_kwargs["pool_size"] = settings.db_pool_size
+    if settings.db_max_overflow is not None:
+        engine_kwargs["max_overflow"] = settings.db_max_overflow
+
+# Neon's pooler endpoint runs PgBouncer in transaction mode, which can't track
+# prepared statements across transactions - disable asyncpg's statement caches
+if "pooler" in settings.database_url or "pgbouncer" in settings.database_url:
+    engine_kwargs["connect_args"] = {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "server_settings": {"jit": "off"}
+    }
 
 engine = create_async_engine(settings.database_url, **engine_kwargs)
 
@@ -34,7 +70,8 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 # Base class for models
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
 
 
 async def get_db() -> AsyncSession:
@@ -49,7 +86,64 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
-async def init_db():
-    """Initialize database tables"""
+def _add_missing_columns(sync_conn):
+    """
+    Add nullable columns introduced after a table was first created (create_all skips them).
+    Tables that don't exist yet are created, so a fresh database works without create_all.
+    """
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            table.create(sync_conn)
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=sync_conn.dialect)
+                sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def _create_missing_indexes(sync_conn):
+    """Create indexes added after a table was first created (create_all skips them)"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+# Set once the schema check has run, so it happens at most once per process
+_INITIALIZED = False
+
+
+def should_run_migrations() -> bool:
+    """
+    Whether startup should run the full schema check (tables and indexes).
+    Serverless cold starts skip it unless RUN_MIGRATIONS=1 is set, saving a
+    round-trip per index per invocation; long-lived servers always run it.
+    Missing columns are added either way (see init_db).
+    """
+    if os.getenv("RUN_MIGRATIONS") is not None:
+        return os.getenv("RUN_MIGRATIONS") == "1"
+    return not is_serverless
+
+
+async def init_db(full: bool = True):
+    """
+    Initialize database tables.
+
+    Args:
+        full: Also run create_all and create missing indexes. Without it only the
+              cheap column check runs, so new columns still reach existing databases.
+    """
+    global _INITIALIZED
+    if _INITIALIZED:
+        return
+
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        if full:
+            await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        if full:
+            await conn.run_sync(_create_missing_indexes)
+
+    _INITIALIZED = True
@@ -1,18 +1,33 @@
 """Main FastAPI application for Golf Coach API"""
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 import logging
+import queue
 
-from app.config import settings
-from app.database import init_db
+from app.config import get_settings
+from app.database import init_db, should_run_migrations
 from app.routers.swings import router as swings_router, health_router
 from app.routers.debug import router as debug_router
+from app.services.claude_service import claude_service
+
+settings = get_settings()
+
+# Configure logging. Records go through a queue and are written by a listener
+# thread, so enabled logging never blocks the event loop on stream I/O.
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
-# Configure logging
 logging.basicConfig(
     level=logging.INFO if settings.debug_mode else logging.WARNING,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[QueueHandler(_log_queue)]
 )
 
 logger = logging.getLogger(__name__)
@@ -48,9 +63,12 @@ async def lifespan(app: FastAPI):
     print(f"  Driver: {'asyncpg' if 'asyncpg' in settings.database_url else 'aiosqlite'}")
     print(f"{'='*60}\n")
 
+    full_schema_check = should_run_migrations()
     logger.info(f"Initializing {db_type} database...")
+    if not full_schema_check:
+        logger.info("Skipping the index check (set RUN_MIGRATIONS=1 to enable)")
     try:
-        await init_db()
+        await init_db(full=full_schema_check)
         logger.info("Database initialized successfully")
         print(f"✓ Database connection established ({db_type})")
     except Exception as e:
@@ -63,6 +81,7 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down Golf Coach API...")
+    await claude_service.aclose()
 
 
 # Create FastAPI application
@@ -70,9 +89,48 @@ app = FastAPI(
     title="Golf Coach API",
     description="Backend API for golf swing analysis using Claude AI",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson serializes the large base64 image payloads much faster than stdlib json
+    default_response_class=ORJSONResponse
 )
 
+# Largest accepted request body: 4 images at the size limit plus multipart/form overhead
+MAX_REQUEST_BYTES = (4 * settings.max_image_size_mb + 1) * 1024 * 1024
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject oversized uploads from Content-Length before the body is read.
+    Written as plain ASGI rather than @app.middleware("http"): Starlette's
+    BaseHTTPMiddleware holds the response until BackgroundTasks finish, which
+    would delay the 202 of background analyses by the whole Claude call.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > self.max_bytes:
+                        response = ORJSONResponse(
+                            status_code=413,
+                            content={"detail": f"Request body too large (max {self.max_bytes // (1024 * 1024)}MB)"}
+                        )
+                        await response(scope, receive, send)
+                        return
+                    break
+
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_REQUEST_BYTES)
+
+# Compress responses - base64 image payloads shrink to a fraction of their size
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -1,5 +1,5 @@
 """Pydantic schemas for request/response validation"""
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, List
 from datetime import datetime
 from enum import Enum
@@ -49,9 +49,9 @@ class SwingResponse(BaseModel):
     shot_outcome: Optional[str] = Field(None, description="Shot outcome")
     focus_area: Optional[str] = Field(None, description="What golfer was working on")
     notes: Optional[str] = Field(None, description="Additional notes")
+    status: str = Field("completed", description="pending, completed or failed")
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class SwingHistoryItem(BaseModel):
@@ -65,23 +65,24 @@ class SwingHistoryItem(BaseModel):
     club: Optional[str] = Field(None, description="Club used")
     shot_outcome: Optional[str] = Field(None, description="Shot outcome")
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class SwingHistoryResponse(BaseModel):
     """Response model for swing history list"""
     total: int
     swings: List[SwingHistoryItem]
+    next_cursor: Optional[int] = Field(None, description="Pass as before_id to fetch the next page")
 
 
 class AnalyzeSwingResponse(BaseModel):
     """Response after analyzing a swing"""
     swing_id: int
-    analysis: str
+    analysis: Optional[str] = Field(None, description="Full analysis text (None while pending)")
     rating: Optional[int]
     summary: Optional[str]
     created_at: datetime
+    status: str = Field("completed", description="pending when analysis runs in the background")
     message: str = "Swing analyzed successfully"
     request_id: Optional[str] = Field(None, description="Debug request ID for tracking")
 
@@ -1,5 +1,9 @@
 """Database models for swing analysis"""
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import String, Text, DateTime, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -12,32 +16,57 @@ class Swing(Base):
 
     __tablename__ = "swings"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Fetch server-generated values (id, created_at) with INSERT ... RETURNING,
+    # so creating a swing doesn't need a follow-up SELECT to refresh it
+    __mapper_args__ = {"eager_defaults": True}
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
 
     # Timestamp for when the analysis was created
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     # Images stored as base64 strings in JSON format
     # Structure: {"address": "base64...", "top": "base64...", "impact": "base64...", "follow_through": "base64..."}
-    images = Column(JSON, nullable=False)
+    # Deferred so metadata queries don't drag MBs of base64 through the pool;
+    # callers that need the blob must request it with undefer(Swing.images).
+    # Stored as pre-parsed JSONB on Postgres; SQLite keeps plain JSON.
+    images: Mapped[Dict[str, str]] = mapped_column(
+        JSON().with_variant(JSONB(), "postgresql"),
+        deferred=True,
+        deferred_raiseload=True
+    )
+
+    # Small base64 thumbnail of the first image, computed once at write time
+    # so history listings are a plain column read
+    thumbnail: Mapped[Optional[str]] = mapped_column(Text)
+
+    # Processing state: "pending" while a background analysis runs, then "completed" or "failed"
+    # (NULL on rows saved before this column existed, all of which are completed)
+    status: Mapped[Optional[str]] = mapped_column(String(20), default="completed")
 
-    # Analysis result from Claude API (full structured response)
-    analysis = Column(Text, nullable=False)
+    # Analysis result from Claude API (full structured response, empty while pending)
+    analysis: Mapped[str] = mapped_column(Text)
 
     # Brief summary for quick display in history (extracted from analysis)
-    summary = Column(String(500), nullable=True)
+    summary: Mapped[Optional[str]] = mapped_column(String(500))
 
     # Overall rating (1-10) extracted from analysis
-    rating = Column(Integer, nullable=True)
+    rating: Mapped[Optional[int]]
 
     # Swing positions included in this analysis (comma-separated: "address,top,impact,follow_through")
-    positions_analyzed = Column(String(200), nullable=False)
+    positions_analyzed: Mapped[str] = mapped_column(String(200))
 
     # Shot annotation fields (user-provided context)
-    club = Column(String(100), nullable=True)  # e.g., "Driver", "7-iron"
-    shot_outcome = Column(String(50), nullable=True)  # e.g., "Straight", "Hook", "Slice"
-    focus_area = Column(Text, nullable=True)  # What they were working on
-    notes = Column(Text, nullable=True)  # Additional context
+    club: Mapped[Optional[str]] = mapped_column(String(100))  # e.g., "Driver", "7-iron"
+    shot_outcome: Mapped[Optional[str]] = mapped_column(String(50))  # e.g., "Straight", "Hook", "Slice"
+    focus_area: Mapped[Optional[str]] = mapped_column(Text)  # What they were working on
+    notes: Mapped[Optional[str]] = mapped_column(Text)  # Additional context
 
     def __repr__(self):
         return f"<Swing(id={self.id}, created_at={self.created_at}, rating={self.rating}, club={self.club})>"
+
+
+# The recent-swings lookup for prompt history orders by created_at DESC with a
+# LIMIT, so a matching descending index turns the full sort into an index scan.
+# The paginated history list uses keyset pagination on the primary key instead.
+Index("ix_swings_created_at", Swing.created_at.desc())
@@ -1,17 +1,22 @@
 """API router for swing analysis endpoints"""
-from typing import List, Dict
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header
+import asyncio
+import orjson
+from typing import List, Dict, Optional, Tuple
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Header
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, AsyncSessionLocal
 from app.models.schemas import (
     SwingResponse,
     SwingHistoryResponse,
     AnalyzeSwingResponse,
     ErrorResponse
 )
+from app.models.swing import Swing
 from app.services.claude_service import claude_service
 from app.services.swing_service import swing_service
-from app.utils.image_utils import validate_image, image_to_base64_with_type, validate_swing_position
+from app.utils.image_utils import validate_and_read_image, validate_swing_position
 from app.utils.debug_logger import DebugLogger
 import logging
 
@@ -20,12 +25,156 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/swings", tags=["swings"])
 
 
+async def _prepare_uploads(
+    uploaded_files: Dict[str, Optional[UploadFile]],
+    debug: DebugLogger
+) -> Tuple[Dict[str, bytes], Dict[str, str], List[str]]:
+    """
+    Validate uploads and read their bytes and media types (steps 5-6).
+    Images stay as raw bytes; base64 encoding happens only where a string is needed.
+
+    Args:
+        uploaded_files: Dictionary of position -> upload (None for positions not sent)
+        debug: Debug logger for the request
+
+    Returns:
+        Tuple of (position -> image bytes, position -> media type, positions in order)
+
+    Raises:
+        HTTPException: If no images, too many images, or an invalid image was sent
+    """
+    # Filter out None values (files that weren't uploaded)
+    uploaded_files = {k: v for k, v in uploaded_files.items() if v is not None}
+
+    if not uploaded_files:
+        raise HTTPException(
+            status_code=400,
+            detail="At least one image is required for analysis"
+        )
+
+    if len(uploaded_files) > 4:
+        raise HTTPException(
+            status_code=400,
+            detail="Maximum 4 images allowed"
+        )
+
+    logger.info("Received %d images for analysis: %s", len(uploaded_files), list(uploaded_files))
+
+    # Steps 5-6: Validate all images and detect their media types.
+    # Each upload is independent, so validate them concurrently
+    debug.log_step(5, "started", details={
+        "image_count": len(uploaded_files),
+        "positions": list(uploaded_files.keys())
+    })
+
+    async def _prepare(position: str, file: UploadFile):
+        # Read each upload once and verify it in a worker thread
+        try:
+            image_bytes, media_type = await validate_and_read_image(file)
+        finally:
+            await file.close()
+        return position, image_bytes, media_type
+
+    prepared = await asyncio.gather(*[
+        _prepare(position, file) for position, file in uploaded_files.items()
+    ])
+
+    debug.log_step(5, "completed", details={
+        "validated_images": len(uploaded_files),
+        "max_size_mb": 5
+    })
+
+    images: Dict[str, bytes] = {}
+    images_media_types: Dict[str, str] = {}
+    positions: List[str] = []
+
+    for position, image_bytes, media_type in prepared:
+        images[position] = image_bytes
+        images_media_types[position] = media_type
+        positions.append(position)
+
+    debug.log_step(6, "completed", details={
+        "converted_images": len(images),
+        "media_types": images_media_types,
+        "positions": positions
+    })
+
+    return images, images_media_types, positions
+
+
+async def _save_analysis(
+    db: AsyncSession,
+    debug: DebugLogger,
+    analysis_text: str,
+    images: Dict[str, bytes],
+    positions: List[str],
+    annotation_context: Dict,
+    swing_id: Optional[int] = None
+) -> Tuple[Optional[Swing], Optional[int], Optional[str]]:
+    """
+    Parse rating and summary from a finished analysis and save it (steps 10-12).
+    Shared by the regular, streaming and background paths.
+
+    Args:
+        db: Database session
+        debug: Debug logger for the request
+        analysis_text: Complete analysis text from Claude
+        images: Dictionary of position -> raw image bytes
+        positions: List of positions analyzed
+        annotation_context: User-provided context (club, shot_outcome, focus_area, notes)
+        swing_id: ID of a pending swing to complete; a new swing is created if None
+
+    Returns:
+        Tuple of (new swing, or None when completing a pending one, rating, summary)
+    """
+    debug.log_step(10, "completed", details={"message": "Analysis received from Claude"})
+
+    # Step 11: Parse rating and summary from analysis
+    debug.log_step(11, "started", details={"analysis_length": len(analysis_text)})
+
+    rating, summary = claude_service.parse_analysis(analysis_text)
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Received analysis from Claude. Rating: %s, Summary length: %d", rating, len(summary) if summary else 0)
+
+    debug.log_step(11, "completed", details={
+        "rating": rating,
+        "summary_length": len(summary) if summary else 0
+    })
+
+    # Step 12: Save to database with annotation fields
+    debug.log_step(12, "started", details={"message": "Saving swing record to database"})
+
+    if swing_id is not None:
+        await swing_service.complete_swing(db, swing_id, analysis_text, rating=rating, summary=summary)
+        debug.log_step(12, "completed", details={"swing_id": swing_id})
+        return None, rating, summary
+
+    swing = await swing_service.create_swing(
+        db=db,
+        images=images,
+        analysis=analysis_text,
+        positions=positions,
+        rating=rating,
+        summary=summary,
+        **annotation_context
+    )
+
+    debug.log_step(12, "completed", details={
+        "swing_id": swing.id,
+        "created_at": str(swing.created_at)
+    })
+
+    return swing, rating, summary
+
+
 @router.post(
     "/analyze",
     response_model=AnalyzeSwingResponse,
-    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
+    responses={202: {"model": AnalyzeSwingResponse}, 400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
 )
 async def analyze_swing(
+    background_tasks: BackgroundTasks,
     address: UploadFile = File(None),
     top: UploadFile = File(None),
     impact: UploadFile = File(None),
@@ -34,6 +183,7 @@ async def analyze_swing(
     shot_outcome: str = Form(None),
     focus_area: str = Form(None),
     notes: str = Form(None),
+    background: bool = Form(False),
     x_request_id: str = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
@@ -49,6 +199,11 @@ async def analyze_swing(
     At least one image is required. Images should be JPEG or PNG format, max 5MB each.
 
     Returns the analysis from Claude along with a swing ID for future reference.
+
+    With `background=true` the swing is saved as pending and the endpoint returns
+    202 immediately; poll `GET /api/swings/{swing_id}` until `status` is no longer
+    "pending". Background mode needs a long-lived server - serverless runtimes may
+    freeze the function once the response is sent.
     """
     # Initialize debug logger with request ID from frontend (if provided)
     debug = DebugLogger(request_id=x_request_id)
@@ -73,57 +228,7 @@ async def analyze_swing(
             "follow_through": follow_through
         }
 
-        # Filter out None values (files that weren't uploaded)
-        uploaded_files = {k: v for k, v in uploaded_files.items() if v is not None}
-
-        if not uploaded_files:
-            raise HTTPException(
-                status_code=400,
-                detail="At least one image is required for analysis"
-            )
-
-        if len(uploaded_files) > 4:
-            raise HTTPException(
-                status_code=400,
-                detail="Maximum 4 images allowed"
-            )
-
-        logger.info(f"Received {len(uploaded_files)} images for analysis: {list(uploaded_files.keys())}")
-
-        # Step 5: Validate all images
-        debug.log_step(5, "started", details={
-            "image_count": len(uploaded_files),
-            "positions": list(uploaded_files.keys())
-        })
-
-        for position, file in uploaded_files.items():
-            await validate_image(file)
-
-        debug.log_step(5, "completed", details={
-            "validated_images": len(uploaded_files),
-            "max_size_mb": 5
-        })
-
-        # Step 6: Convert images to base64 with their media types
-        debug.log_step(6, "started")
-
-        images_base64: Dict[str, str] = {}
-        images_media_types: Dict[str, str] = {}
-        positions: List[str] = []
-
-        for position, file in uploaded_files.items():
-            base64_data, media_type = await image_to_base64_with_type(file)
-            images_base64[position] = base64_data
-            images_media_types[position] = media_type
-            positions.append(position)
-
-        logger.info(f"Converted {len(images_base64)} images to base64")
-
-        debug.log_step(6, "completed", details={
-            "converted_images": len(images_base64),
-            "media_types": images_media_types,
-            "positions": positions
-        })
+        images, images_media_types, positions = await _prepare_uploads(uploaded_files, debug)
 
         # Build annotation context
         annotation_context = {
@@ -133,11 +238,45 @@ async def analyze_swing(
             "notes": notes
         }
 
+        if background:
+            # Save a pending swing now and run steps 7-12 after the response is sent
+            swing = await swing_service.create_swing(
+                db=db,
+                images=images,
+                analysis="",
+                positions=positions,
+                club=club,
+                shot_outcome=shot_outcome,
+                focus_area=focus_area,
+                notes=notes,
+                status="pending"
+            )
+
+            background_tasks.add_task(
+                _analyze_in_background,
+                swing.id,
+                images,
+                positions,
+                images_media_types,
+                annotation_context,
+                debug
+            )
+
+            return ORJSONResponse(status_code=202, content=AnalyzeSwingResponse(
+                swing_id=swing.id,
+                rating=None,
+                summary=None,
+                created_at=swing.created_at,
+                status="pending",
+                message="Swing accepted for analysis",
+                request_id=debug.request_id
+            ).model_dump(mode="json"))
+
         # Steps 7-10: Call Claude API (which internally fetches history, builds prompt, and calls API)
         debug.log_step(7, "started", details={"message": "Fetching recent swing history"})
 
         analysis_text = await claude_service.analyze_swing(
-            images_base64,
+            images,
             positions,
             images_media_types,
             annotation_context,
@@ -146,41 +285,10 @@ async def analyze_swing(
         )
 
         # Claude service will log steps 7-10 internally
-        debug.log_step(10, "completed", details={"message": "Analysis received from Claude"})
-
-        # Step 11: Parse rating and summary from analysis
-        debug.log_step(11, "started", details={"analysis_length": len(analysis_text)})
-
-        rating, summary = claude_service.parse_analysis(analysis_text)
-
-        logger.info(f"Received analysis from Claude. Rating: {rating}, Summary length: {len(summary) if summary else 0}")
-
-        debug.log_step(11, "completed", details={
-            "rating": rating,
-            "summary_length": len(summary) if summary else 0
-        })
-
-        # Step 12: Save to database with annotation fields
-        debug.log_step(12, "started", details={"message": "Saving swing record to database"})
-
-        swing = await swing_service.create_swing(
-            db=db,
-            images=images_base64,
-            analysis=analysis_text,
-            positions=positions,
-            rating=rating,
-            summary=summary,
-            club=club,
-            shot_outcome=shot_outcome,
-            focus_area=focus_area,
-            notes=notes
+        swing, rating, summary = await _save_analysis(
+            db, debug, analysis_text, images, positions, annotation_context
         )
 
-        debug.log_step(12, "completed", details={
-            "swing_id": swing.id,
-            "created_at": str(swing.created_at)
-        })
-
         # Step 13: Return structured response to frontend
         debug.log_step(13, "completed", details={
             "swing_id": swing.id,
@@ -188,10 +296,13 @@ async def analyze_swing(
             "message": "Backend successfully returning response to frontend"
         })
 
-        # Finalize debug session
-        debug.finalize(success=True)
+        # Finalize debug session after the response is sent; error paths below
+        # still finalize inline so failures are written before the 5xx goes out
+        background_tasks.add_task(debug.finalize, success=True)
 
-        return AnalyzeSwingResponse(
+        # Dump once and skip response_model re-validation (BackgroundTasks still run
+        # because FastAPI attaches them to the returned response)
+        return ORJSONResponse(content=AnalyzeSwingResponse(
             swing_id=swing.id,
             analysis=analysis_text,
             rating=rating,
@@ -199,7 +310,7 @@ async def analyze_swing(
             created_at=swing.created_at,
             message="Swing analyzed successfully",
             request_id=debug.request_id  # Include request ID in response for frontend
-        )
+        ).model_dump(mode="json"))
 
     except HTTPException as he:
         # Log the HTTP exception to debug logger
@@ -222,13 +333,174 @@ async def analyze_swing(
         )
         debug.finalize(success=False)
 
-        logger.error(f"Error analyzing swing: {str(e)}")
+        logger.error("Error analyzing swing: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to analyze swing: {str(e)}"
         )
 
 
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+@router.post(
+    "/analyze/stream",
+    responses={400: {"model": ErrorResponse}}
+)
+async def analyze_swing_stream(
+    address: UploadFile = File(None),
+    top: UploadFile = File(None),
+    impact: UploadFile = File(None),
+    follow_through: UploadFile = File(None),
+    club: str = Form(None),
+    shot_outcome: str = Form(None),
+    focus_area: str = Form(None),
+    notes: str = Form(None),
+    x_request_id: str = Header(None)
+):
+    """
+    Analyze golf swing like `/analyze`, streaming the analysis as Server-Sent Events.
+
+    Events:
+    - delta: a JSON string with the next chunk of analysis text
+    - done: the same body `/analyze` returns, sent once the swing is saved
+    - error: `{"detail": ...}` if analysis fails after streaming has started
+
+    Upload validation errors are returned as a normal 400 before the stream starts.
+    """
+    debug = DebugLogger(request_id=x_request_id)
+    debug.log_step(4, "completed", details={
+        "message": "Backend received FormData request (streaming)",
+        "has_address": address is not None,
+        "has_top": top is not None,
+        "has_impact": impact is not None,
+        "has_follow_through": follow_through is not None
+    })
+
+    try:
+        images, images_media_types, positions = await _prepare_uploads({
+            "address": address,
+            "top": top,
+            "impact": impact,
+            "follow_through": follow_through
+        }, debug)
+    except HTTPException as he:
+        debug.log_step(
+            debug.metadata.get("steps_completed", 0) + 1,
+            "failed",
+            error=f"HTTP {he.status_code}: {he.detail}"
+        )
+        debug.finalize(success=False)
+        raise
+
+    annotation_context = {
+        "club": club,
+        "shot_outcome": shot_outcome,
+        "focus_area": focus_area,
+        "notes": notes
+    }
+
+    async def events():
+        chunks: List[str] = []
+        # The stream outlives the endpoint call, so it uses its own session
+        async with AsyncSessionLocal() as db:
+            try:
+                debug.log_step(7, "started", details={"message": "Fetching recent swing history"})
+
+                async for text in claude_service.analyze_swing_stream(
+                    images,
+                    positions,
+                    images_media_types,
+                    annotation_context,
+                    db,
+                    debug
+                ):
+                    chunks.append(text)
+                    yield _sse("delta", text)
+
+                analysis_text = "".join(chunks)
+
+                # Parse once on the complete text, not per chunk
+                swing, rating, summary = await _save_analysis(
+                    db, debug, analysis_text, images, positions, annotation_context
+                )
+
+                yield _sse("done", AnalyzeSwingResponse(
+                    swing_id=swing.id,
+                    analysis=analysis_text,
+                    rating=rating,
+                    summary=summary,
+                    created_at=swing.created_at,
+                    request_id=debug.request_id
+                ).model_dump(mode="json"))
+
+                debug.log_step(13, "completed", details={"swing_id": swing.id})
+                debug.finalize(success=True)
+
+            except Exception as e:
+                error_msg = f"{type(e).__name__}: {str(e)}"
+                debug.log_step(debug.metadata.get("steps_completed", 0) + 1, "failed", error=error_msg)
+                debug.finalize(success=False)
+
+                logger.error("Error streaming swing analysis: %s", e)
+                yield _sse("error", {"detail": f"Failed to analyze swing: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Marks the body as already encoded so GZipMiddleware doesn't buffer the stream
+            "Content-Encoding": "identity",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+async def _analyze_in_background(
+    swing_id: int,
+    images: Dict[str, bytes],
+    positions: List[str],
+    images_media_types: Dict[str, str],
+    annotation_context: Dict,
+    debug: DebugLogger
+):
+    """Run steps 7-12 for a pending swing after the 202 response has been sent"""
+    # The request's session is closed by now, so the task opens its own
+    async with AsyncSessionLocal() as db:
+        try:
+            debug.log_step(7, "started", details={"message": "Fetching recent swing history"})
+
+            # Nobody is waiting on this response, so it can take the cheaper batch route
+            analyze = claude_service.analyze_swing_batched if settings.claude_use_batches else claude_service.analyze_swing
+            analysis_text = await analyze(
+                images,
+                positions,
+                images_media_types,
+                annotation_context,
+                db,
+                debug
+            )
+
+            await _save_analysis(
+                db, debug, analysis_text, images, positions, annotation_context, swing_id=swing_id
+            )
+
+            debug.finalize(success=True)
+
+        except Exception as e:
+            error_msg = f"{type(e).__name__}: {str(e)}"
+            debug.log_step(debug.metadata.get("steps_completed", 0) + 1, "failed", error=error_msg)
+            debug.finalize(success=False)
+
+            logger.error("Background analysis failed for swing %s: %s", swing_id, e)
+            await swing_service.complete_swing(
+                db, swing_id, f"Failed to analyze swing: {error_msg}", status="failed"
+            )
+
+
 @router.get(
     "/history",
     response_model=SwingHistoryResponse,
@@ -237,6 +509,7 @@ async def analyze_swing(
 async def get_swing_history(
     limit: int = 50,
     offset: int = 0,
+    before_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -248,6 +521,7 @@ async def get_swing_history(
     Query parameters:
     - limit: Maximum number of results to return (default: 50, max: 100)
     - offset: Number of results to skip for pagination (default: 0)
+    - before_id: Cursor for keyset pagination - pass `next_cursor` from the previous page
     """
     try:
         # Validate and cap limit
@@ -256,27 +530,23 @@ async def get_swing_history(
         if limit < 1:
             limit = 1
 
-        logger.info(f"Fetching swing history with limit={limit}, offset={offset}")
+        logger.info("Fetching swing history with limit=%s, offset=%s, before_id=%s", limit, offset, before_id)
 
-        # Get swings from database
-        swings = await swing_service.get_all_swings(db, limit=limit, offset=offset)
-        total = await swing_service.get_swing_count(db)
+        # Get history items with thumbnails and total count (cached between writes)
+        history_items, total = await swing_service.get_history_items(db, limit=limit, offset=offset, before_id=before_id)
 
-        # Convert to history items with thumbnails
-        history_items = [
-            swing_service.swing_to_history_item(swing)
-            for swing in swings
-        ]
+        logger.info("Returning %d swing history items (total: %d)", len(history_items), total)
 
-        logger.info(f"Returning {len(history_items)} swing history items (total: {total})")
-
-        return SwingHistoryResponse(
+        # Items are already validated, so dump once and hand orjson the result
+        # instead of letting response_model re-validate the whole page
+        return ORJSONResponse(content=SwingHistoryResponse(
             total=total,
-            swings=history_items
-        )
+            swings=history_items,
+            next_cursor=history_items[-1].id if len(history_items) == limit else None
+        ).model_dump(mode="json"))
 
     except Exception as e:
-        logger.error(f"Error fetching swing history: {str(e)}")
+        logger.error("Error fetching swing history: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch swing history: {str(e)}"
@@ -299,7 +569,7 @@ async def get_swing(
     analysis text from Claude.
     """
     try:
-        logger.info(f"Fetching swing with ID: {swing_id}")
+        logger.info("Fetching swing with ID: %s", swing_id)
 
         swing = await swing_service.get_swing_by_id(db, swing_id)
 
@@ -309,22 +579,24 @@ async def get_swing(
                 detail=f"Swing with ID {swing_id} not found"
             )
 
-        logger.info(f"Found swing {swing_id}")
+        logger.info("Found swing %s", swing_id)
 
-        return SwingResponse(
+        # Dump once and skip response_model re-validation of the image payload
+        return ORJSONResponse(content=SwingResponse(
             id=swing.id,
             created_at=swing.created_at,
             images=swing.images,
             analysis=swing.analysis,
             summary=swing.summary,
             rating=swing.rating,
-            positions_analyzed=swing.positions_analyzed
-        )
+            positions_analyzed=swing.positions_analyzed,
+            status=swing.status or "completed"
+        ).model_dump(mode="json"))
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching swing {swing_id}: {str(e)}")
+        logger.error("Error fetching swing %s: %s", swing_id, e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch swing: {str(e)}"
@@ -345,19 +617,17 @@ async def delete_swing(
     Returns a success message upon deletion.
     """
     try:
-        logger.info(f"Deleting swing with ID: {swing_id}")
+        logger.info("Deleting swing with ID: %s", swing_id)
 
-        swing = await swing_service.get_swing_by_id(db, swing_id)
+        deleted = await swing_service.delete_swing(db, swing_id)
 
-        if not swing:
+        if not deleted:
             raise HTTPException(
                 status_code=404,
                 detail=f"Swing with ID {swing_id} not found"
             )
 
-        await swing_service.delete_swing(db, swing_id)
-
-        logger.info(f"Successfully deleted swing {swing_id}")
+        logger.info("Successfully deleted swing %s", swing_id)
 
         return {
             "message": f"Swing {swing_id} deleted successfully",
@@ -367,7 +637,7 @@ async def delete_swing(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting swing {swing_id}: {str(e)}")
+        logger.error("Error deleting swing %s: %s", swing_id, e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete swing: {str(e)}"
@@ -402,7 +672,7 @@ async def test_claude_connection():
             logger.info("Claude API test successful")
             return result
         else:
-            logger.error(f"Claude API test failed: {result.get('error_message')}")
+            logger.error("Claude API test failed: %s", result.get('error_message'))
             raise HTTPException(
                 status_code=500,
                 detail=result
@@ -411,7 +681,7 @@ async def test_claude_connection():
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error testing Claude connection: {str(e)}")
+        logger.error("Error testing Claude connection: %s", e)
         raise HTTPException(
             status_code=500,
             detail={
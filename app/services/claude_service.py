@@ -1,23 +1,175 @@
 """Service for interacting with Claude API for swing analysis"""
+import asyncio
+import hashlib
+import json
+import os
+import time
 import re
 import traceback
-from typing import Dict, List
-from anthropic import AsyncAnthropic
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import httpx2
+import pybase64
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 from app.config import settings
+from app.utils.image_utils import preprocess_for_vision
 from app.models.schemas import SwingAnalysisResult, PositionAnalysis
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Header of the first section our prompt asks for, and the rating inside it ("8/10", "8 out of 10")
+_OVERALL_HEADER = re.compile(r'OVERALL ASSESSMENT', re.IGNORECASE)
+_SECTION_RATING = re.compile(r'(\d+)\s*(?:/|out\s+of)\s*10', re.IGNORECASE)
+
+# Fallback patterns for responses that don't follow the prompt's structure, compiled once.
+# Gaps are bounded so a long response can't trigger runaway backtracking.
+_RATING_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r'\b(?:rate|rating|score).{0,200}?\b(\d+)(?:/10|\s*out\s*of\s*10)',
+        r'\b(\d+)/10',
+        r'\b(?:quality|overall).{0,200}?\b(\d+)(?:/10|\s*out\s*of\s*10)',
+    )
+]
+
+_SUMMARY_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE | re.DOTALL)
+    for pattern in (
+        r'\boverall.{0,200}?summary.{0,200}?:\s*(.{1,800}?)(?:\n\n|\n)',
+        r'\bsummary.{0,200}?:\s*(.{1,800}?)(?:\n\n|\n)',
+    )
+]
+
+
+@lru_cache(maxsize=32)
+def _prompt_frame(positions: Tuple[str, ...], has_history: bool) -> Tuple[str, str]:
+    """
+    Build the static parts of the analysis prompt, which only depend on the
+    positions and whether swing history is included (at most 15 x 2 variants).
+
+    Args:
+        positions: Tuple of swing positions in order
+        has_history: Whether the prompt includes previous swings
+
+    Returns:
+        Tuple of (text before the context/history sections, text after them)
+    """
+    positions_str = ", ".join(positions)
+
+    # Build comparison instructions if history exists
+    comparison_instructions = ""
+    if has_history:
+        comparison_instructions = """
+
+5. PROGRESSION ANALYSIS (Compare to previous swings)
+   - What has improved since last time?
+   - What issues are recurring across multiple swings?
+   - What new issues have appeared?
+   - Is the golfer progressing on what they said they were working on?
+   - Provide specific feedback based on their progression pattern"""
+
+    head = f"""You are an expert golf instructor analyzing swing images. I'm providing {len(positions)} image(s) showing the following swing position(s): {positions_str}."""
+    tail = f"""
+
+Please provide a comprehensive analysis with the following structure:
+
+1. OVERALL ASSESSMENT
+   - Rate the swing quality on a scale of 1-10
+   - Provide a 2-3 sentence summary of the overall swing
+
+2. POSITION ANALYSIS
+   For each image provided ({positions_str}), analyze:
+   - Key observations (posture, alignment, club position, body mechanics)
+   - What's being done well
+   - What needs improvement
+
+3. SPECIFIC ISSUES
+   List 2-4 specific technical problems in order of priority (most important first)
+
+4. RECOMMENDATIONS
+   Provide 3-4 actionable drills or changes to improve the swing{comparison_instructions}
+
+Please be specific, constructive, and focus on the most impactful improvements. Factor in the context and progression from previous swings when providing your analysis."""
+
+    return head, tail
+
+
+@lru_cache(maxsize=32)
+def _bare_prompt(positions: Tuple[str, ...]) -> str:
+    """Complete prompt for a first swing sent without context or history"""
+    head, tail = _prompt_frame(positions, False)
+    return head + tail
+
+
+@lru_cache(maxsize=64)
+def _format_history_entry(
+    created_at: datetime,
+    rating: Optional[int],
+    club: Optional[str],
+    shot_outcome: Optional[str],
+    summary: Optional[str]
+) -> str:
+    """Format one previous swing for the prompt's history section (swings never change, so memoized)"""
+    date_str = created_at.strftime("%B %d, %Y")
+    club_info = f", Club: {club}" if club else ""
+    outcome_info = f", Outcome: {shot_outcome}" if shot_outcome else ""
+    rating_info = f"Rating: {rating}/10" if rating else "Not rated"
+    summary = summary[:100] + "..." if summary and len(summary) > 100 else summary or "No summary"
+
+    return f"Swing from {date_str}: {rating_info}{club_info}{outcome_info}\n   Summary: {summary}"
+
 
 class ClaudeService:
     """Service class for Claude API interactions"""
 
+    ANALYSIS_CACHE_SIZE = 256
+    ANALYSIS_CACHE_TTL_SECONDS = 600.0
+    FILE_CACHE_SIZE = 256
+    # Uploaded files expire server-side after a day; entries are reused for a bit less
+    FILE_EXPIRES_SECONDS = 86400
+    FILE_CACHE_TTL_SECONDS = 82800.0
+    FILES_API_BETA = "files-api-2025-04-14"
+
     def __init__(self):
         """Initialize Claude client"""
-        self.client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+        # One long-lived HTTP/2 client: idle connections are kept for a minute
+        # (SDK default is 5s) so sporadic requests skip the TLS handshake, and
+        # concurrent analyses multiplex over a single socket
+        self._http = DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx2.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+        )
+        # The SDK retries rate-limit (429), overloaded (529) and 5xx errors with exponential backoff
+        self.client = AsyncAnthropic(
+            api_key=settings.anthropic_api_key,
+            max_retries=settings.claude_max_retries,
+            http_client=self._http
+        )
+        # Cap in-flight analysis calls so bursts don't blow past the account's rate limits
+        self._semaphore = asyncio.Semaphore(settings.claude_max_concurrency)
+        # Bound concurrent Pillow work across requests to the number of cores
+        self._image_semaphore = asyncio.Semaphore(os.cpu_count() or 2)
+        # Recent analyses keyed by a hash of the images, positions and context, so
+        # retries and repeat submissions skip the API call
+        self._analysis_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # Files API ids of uploaded images keyed by content hash, so an image is
+        # uploaded once and later requests send only its file_id
+        self._file_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # Batched analyses waiting to be submitted, keyed by custom_id
+        self._batch_queue: Dict[str, Tuple[Dict, asyncio.Future]] = {}
+        self._batch_flush: Optional[asyncio.Task] = None
+        # Flushes still waiting on their batch, referenced so they aren't garbage collected
+        self._batch_flushes: Set[asyncio.Task] = set()
         self.model = "claude-3-haiku-20240307"  # Claude 3 Haiku (supports vision)
 
+    async def aclose(self):
+        """Close the underlying HTTP connections (called on application shutdown)"""
+        await self.client.close()
+
     def _build_analysis_prompt(
         self,
         positions: List[str],
@@ -35,8 +187,6 @@ class ClaudeService:
         Returns:
             Formatted prompt string
         """
-        positions_str = ", ".join(positions)
-
         # Build context section
         context_parts = []
         if annotation_context:
@@ -49,80 +199,268 @@ class ClaudeService:
             if annotation_context.get('notes'):
                 context_parts.append(f"Additional context: {annotation_context['notes']}")
 
-        context_section = ""
+        # Common first-swing case: no context or history, so the whole prompt is memoized
+        if not context_parts and not swing_history:
+            return _bare_prompt(tuple(positions))
+
+        # Static instructions are memoized per positions tuple
+        head, tail = _prompt_frame(tuple(positions), bool(swing_history))
+
+        parts = [head]
         if context_parts:
-            context_section = "\n\nCONTEXT:\n" + "\n".join(f"- {part}" for part in context_parts)
+            parts.append("\n\nCONTEXT:\n")
+            parts.append("\n".join(f"- {part}" for part in context_parts))
 
-        # Build swing history section
-        history_section = ""
-        if swing_history and len(swing_history) > 0:
-            history_lines = ["\n\nPREVIOUS SWING HISTORY:"]
+        # Build swing history section (each swing's entry is formatted once and memoized)
+        if swing_history:
+            parts.append("\n\nPREVIOUS SWING HISTORY:")
             for i, swing in enumerate(swing_history, 1):
-                date_str = swing.created_at.strftime("%B %d, %Y")
-                club_info = f", Club: {swing.club}" if swing.club else ""
-                outcome_info = f", Outcome: {swing.shot_outcome}" if swing.shot_outcome else ""
-                rating_info = f"Rating: {swing.rating}/10" if swing.rating else "Not rated"
-                summary = swing.summary[:100] + "..." if swing.summary and len(swing.summary) > 100 else swing.summary or "No summary"
+                parts.append(f"\n{i}. ")
+                parts.append(_format_history_entry(
+                    swing.created_at, swing.rating, swing.club, swing.shot_outcome, swing.summary
+                ))
 
-                history_lines.append(f"{i}. Swing from {date_str}: {rating_info}{club_info}{outcome_info}")
-                history_lines.append(f"   Summary: {summary}")
+        parts.append(tail)
 
-            history_section = "\n".join(history_lines)
+        return "".join(parts)
 
-        # Build comparison instructions if history exists
-        comparison_instructions = ""
-        if swing_history and len(swing_history) > 0:
-            comparison_instructions = """
+    @staticmethod
+    def _analysis_cache_key(
+        images: Dict[str, bytes],
+        positions: List[str],
+        annotation_context: Dict = None,
+        image_urls: Dict[str, str] = None
+    ) -> str:
+        """Hash everything that identifies a repeat submission (blocking - run in a worker thread)"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(
+            [positions, annotation_context or {}, image_urls or {}], sort_keys=True
+        ).encode())
+        for position in sorted(images):
+            digest.update(position.encode())
+            digest.update(images[position])
+        return digest.hexdigest()
+
+    def _get_cached_analysis(self, cache_key: str) -> Optional[str]:
+        """Return a cached analysis, or None if missing or expired"""
+        cached = self._analysis_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < self.ANALYSIS_CACHE_TTL_SECONDS:
+            self._analysis_cache.move_to_end(cache_key)
+            return cached[1]
+        return None
+
+    def _cache_analysis(self, cache_key: str, analysis_text: str):
+        """Store an analysis, evicting the least recently used entry when full"""
+        self._analysis_cache[cache_key] = (time.monotonic(), analysis_text)
+        self._analysis_cache.move_to_end(cache_key)
+        if len(self._analysis_cache) > self.ANALYSIS_CACHE_SIZE:
+            self._analysis_cache.popitem(last=False)
+
+    async def _preprocess_image(self, image_bytes: bytes, media_type: str) -> Tuple[bytes, str]:
+        """Run preprocess_for_vision in a worker thread, bounded by the image semaphore"""
+        async with self._image_semaphore:
+            return await asyncio.to_thread(preprocess_for_vision, image_bytes, media_type)
+
+    async def _upload_image(self, image_bytes: bytes, media_type: str) -> Optional[str]:
+        """
+        Upload an image to the Files API, reusing the file_id of an identical earlier upload.
 
-5. PROGRESSION ANALYSIS (Compare to previous swings)
-   - What has improved since last time?
-   - What issues are recurring across multiple swings?
-   - What new issues have appeared?
-   - Is the golfer progressing on what they said they were working on?
-   - Provide specific feedback based on their progression pattern"""
+        Returns:
+            The file_id, or None if the upload failed (callers fall back to base64)
+        """
+        key = await asyncio.to_thread(lambda: hashlib.sha256(image_bytes).hexdigest())
 
-        prompt = f"""You are an expert golf instructor analyzing swing images. I'm providing {len(positions)} image(s) showing the following swing position(s): {positions_str}.{context_section}{history_section}
+        cached = self._file_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.FILE_CACHE_TTL_SECONDS:
+            self._file_cache.move_to_end(key)
+            return cached[1]
 
-Please provide a comprehensive analysis with the following structure:
+        try:
+            uploaded = await self.client.beta.files.upload(
+                file=(f"{key[:16]}.{media_type.rpartition('/')[2]}", image_bytes, media_type),
+                expires_in_seconds=self.FILE_EXPIRES_SECONDS,
+                betas=[self.FILES_API_BETA]
+            )
+        except Exception as e:
+            logger.warning("Files API upload failed, sending image inline: %s: %s", type(e).__name__, e)
+            return None
 
-1. OVERALL ASSESSMENT
-   - Rate the swing quality on a scale of 1-10
-   - Provide a 2-3 sentence summary of the overall swing
+        self._file_cache[key] = (time.monotonic(), uploaded.id)
+        if len(self._file_cache) > self.FILE_CACHE_SIZE:
+            self._file_cache.popitem(last=False)
 
-2. POSITION ANALYSIS
-   For each image provided ({positions_str}), analyze:
-   - Key observations (posture, alignment, club position, body mechanics)
-   - What's being done well
-   - What needs improvement
+        return uploaded.id
 
-3. SPECIFIC ISSUES
-   List 2-4 specific technical problems in order of priority (most important first)
+    async def _build_request(
+        self,
+        images: Dict[str, bytes],
+        positions: List[str],
+        media_types: Dict[str, str] = None,
+        annotation_context: Dict = None,
+        db = None,
+        debug = None,
+        image_urls: Dict[str, str] = None,
+        use_files: bool = False
+    ) -> Dict:
+        """
+        Fetch swing history and build the Messages API parameters (steps 7-8).
+        Shared by the live and batch analysis paths.
 
-4. RECOMMENDATIONS
-   Provide 3-4 actionable drills or changes to improve the swing{comparison_instructions}
+        Args:
+            use_files: Send uploaded images as Files API references. The returned
+                params then include "betas" and must go to client.beta.messages.
 
-Please be specific, constructive, and focus on the most impactful improvements. Factor in the context and progression from previous swings when providing your analysis."""
+        Returns:
+            Keyword arguments for messages.create / a batch request's params
+        """
+        # Downscale uploaded images off the event loop so Vision bills fewer tokens
+        uploaded_positions = [
+            position for position in positions
+            if position in images and not (image_urls and image_urls.get(position))
+        ]
+        preprocess = asyncio.gather(*[
+            self._preprocess_image(
+                images[position],
+                media_types.get(position, "image/jpeg") if media_types else "image/jpeg"
+            )
+            for position in uploaded_positions
+        ])
+
+        # Step 7: Get recent swing history for comparison if db session provided.
+        # The query is independent of the images, so it overlaps with preprocessing.
+        swing_history = []
+        if db:
+            from app.services.swing_service import swing_service
+            swing_history, prepared = await asyncio.gather(
+                swing_service.get_recent_swings(db, limit=3),
+                preprocess
+            )
+
+            # End the read transaction so the pooled connection isn't held
+            # (idle in transaction) for the length of the Claude call
+            await db.commit()
+
+            if debug:
+                debug.log_step(7, "completed", details={
+                    "history_count": len(swing_history),
+                    "message": f"Fetched {len(swing_history)} recent swings for comparison"
+                })
+        else:
+            prepared = await preprocess
+
+        vision_images = dict(zip(uploaded_positions, prepared))
+
+        # Upload images (or reuse earlier uploads) so only file ids go in the request
+        file_ids = {}
+        if use_files and uploaded_positions:
+            uploaded = await asyncio.gather(*[
+                self._upload_image(*vision_images[position]) for position in uploaded_positions
+            ])
+            file_ids = {
+                position: file_id
+                for position, file_id in zip(uploaded_positions, uploaded)
+                if file_id
+            }
+
+        # Base64 encode only what goes inline - the one place images need to be strings
+        inline_images = await asyncio.to_thread(lambda: {
+            position: pybase64.b64encode_as_string(vision_images[position][0])
+            for position in uploaded_positions
+            if position not in file_ids
+        })
+
+        # Step 8: Build the prompt with context and history
+        if debug:
+            debug.log_step(8, "started", details={"message": "Building intelligent prompt"})
+
+        prompt = self._build_analysis_prompt(positions, annotation_context, swing_history)
+
+        if debug:
+            debug.log_step(8, "completed", details={
+                "prompt_length": len(prompt),
+                "has_history": len(swing_history) > 0,
+                "has_context": annotation_context is not None
+            })
+
+        # Build the message content with images
+        content = []
+
+        # Add images in the order specified by positions
+        for position in positions:
+            image_url = image_urls.get(position) if image_urls else None
+            if image_url or position in images:
+                # Add position label
+                content.append({
+                    "type": "text",
+                    "text": f"[{position.upper()} POSITION]"
+                })
+
+                if image_url:
+                    # Let Claude fetch the image itself - keeps the request body tiny
+                    source = {
+                        "type": "url",
+                        "url": image_url
+                    }
+                elif position in file_ids:
+                    # Reference the already-uploaded file instead of resending its bytes
+                    source = {
+                        "type": "file",
+                        "file_id": file_ids[position]
+                    }
+                else:
+                    # Send the downscaled image inline
+                    source = {
+                        "type": "base64",
+                        "media_type": vision_images[position][1],
+                        "data": inline_images[position]
+                    }
+
+                # Add image
+                content.append({
+                    "type": "image",
+                    "source": source
+                })
 
-        return prompt
+        # Add the analysis prompt
+        content.append({
+            "type": "text",
+            "text": prompt
+        })
+
+        params = {
+            "model": self.model,
+            "max_tokens": 2048,
+            "messages": [{
+                "role": "user",
+                "content": content
+            }]
+        }
+        if file_ids:
+            params["betas"] = [self.FILES_API_BETA]
+
+        return params
 
     async def analyze_swing(
         self,
-        images: Dict[str, str],
+        images: Dict[str, bytes],
         positions: List[str],
         media_types: Dict[str, str] = None,
         annotation_context: Dict = None,
         db = None,
-        debug = None
+        debug = None,
+        image_urls: Dict[str, str] = None
     ) -> str:
         """
         Analyze golf swing using Claude Vision API.
 
         Args:
-            images: Dictionary mapping position names to base64 encoded images
+            images: Dictionary mapping position names to raw image bytes
             positions: List of position names in order
             media_types: Dictionary mapping position names to media types (e.g., 'image/jpeg', 'image/png')
             annotation_context: User-provided context about the swing
             db: Database session for querying swing history
+            image_urls: Optional dictionary mapping position names to publicly fetchable
+                image URLs. Positions with a URL are sent by reference instead of base64.
 
         Returns:
             Analysis text from Claude
@@ -131,77 +469,27 @@ Please be specific, constructive, and focus on the most impactful improvements.
             Exception: If API call fails
         """
         try:
-            # Step 7: Get recent swing history for comparison if db session provided
-            swing_history = []
-            if db:
-                from app.services.swing_service import swing_service
-                swing_history = await swing_service.get_recent_swings(db, limit=3)
-
+            cache_key = await asyncio.to_thread(
+                self._analysis_cache_key, images, positions, annotation_context, image_urls
+            )
+            cached = self._get_cached_analysis(cache_key)
+            if cached is not None:
                 if debug:
-                    debug.log_step(7, "completed", details={
-                        "history_count": len(swing_history),
-                        "message": f"Fetched {len(swing_history)} recent swings for comparison"
-                    })
-
-            # Step 8: Build the prompt with context and history
-            if debug:
-                debug.log_step(8, "started", details={"message": "Building intelligent prompt"})
-
-            prompt = self._build_analysis_prompt(positions, annotation_context, swing_history)
-
-            if debug:
-                debug.log_step(8, "completed", details={
-                    "prompt_length": len(prompt),
-                    "has_history": len(swing_history) > 0,
-                    "has_context": annotation_context is not None
-                })
+                    debug.log_step(9, "completed", details={"cached": True})
+                logger.info("Returning cached analysis for identical submission")
+                return cached
 
-            # Build the message content with images
-            content = []
-
-            # Add images in the order specified by positions
-            for position in positions:
-                if position in images:
-                    # Add position label
-                    content.append({
-                        "type": "text",
-                        "text": f"[{position.upper()} POSITION]"
-                    })
-
-                    # Get base64 data and media type
-                    base64_data = images[position]
-                    media_type = media_types.get(position, "image/jpeg") if media_types else "image/jpeg"
-
-                    # Add image
-                    content.append({
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": media_type,
-                            "data": base64_data
-                        }
-                    })
-
-            # Add the analysis prompt
-            content.append({
-                "type": "text",
-                "text": prompt
-            })
+            params = await self._build_request(
+                images, positions, media_types, annotation_context, db, debug, image_urls,
+                use_files=settings.claude_use_files_api
+            )
+            content = params["messages"][0]["content"]
 
-            # Detailed logging before API call
-            print(f"\n{'='*60}")
-            print(f"PREPARING CLAUDE API CALL")
-            print(f"{'='*60}")
-            print(f"Model: {self.model}")
-            print(f"Positions: {positions}")
-            print(f"Number of content blocks: {len(content)}")
-            print(f"Max tokens: 2048")
-            print(f"API Key (first 20 chars): {settings.anthropic_api_key[:20]}...")
-            print(f"{'='*60}\n")
-
-            logger.info(f"Calling Claude API to analyze {len(positions)} swing positions")
-            logger.info(f"Using model: {self.model}")
-            logger.info(f"Content blocks: {len(content)}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Calling Claude: model=%s positions=%s content_blocks=%d max_tokens=%d",
+                    self.model, positions, len(content), params["max_tokens"]
+                )
 
             # Step 9: Call Claude API
             if debug:
@@ -212,14 +500,10 @@ Please be specific, constructive, and focus on the most impactful improvements.
                     "max_tokens": 2048
                 })
 
-            response = await self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,
-                messages=[{
-                    "role": "user",
-                    "content": content
-                }]
-            )
+            # File references need the beta endpoint
+            messages = self.client.beta.messages if "betas" in params else self.client.messages
+            async with self._semaphore:
+                response = await messages.create(**params)
 
             if debug:
                 debug.log_step(9, "completed", details={
@@ -230,44 +514,202 @@ Please be specific, constructive, and focus on the most impactful improvements.
                     "total_tokens": response.usage.input_tokens + response.usage.output_tokens
                 })
 
-            # Detailed logging after API call
-            print(f"\n{'='*60}")
-            print(f"CLAUDE API RESPONSE RECEIVED")
-            print(f"{'='*60}")
-            print(f"Response ID: {response.id}")
-            print(f"Model: {response.model}")
-            print(f"Stop reason: {response.stop_reason}")
-            print(f"Usage - Input tokens: {response.usage.input_tokens}")
-            print(f"Usage - Output tokens: {response.usage.output_tokens}")
-            print(f"Content blocks: {len(response.content)}")
-            print(f"{'='*60}\n")
-
             # Extract text from response
             analysis_text = response.content[0].text
 
-            logger.info("Successfully received analysis from Claude")
-            logger.info(f"Response ID: {response.id}, Tokens used: {response.usage.input_tokens + response.usage.output_tokens}")
+            self._cache_analysis(cache_key, analysis_text)
+
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Claude response: id=%s model=%s stop_reason=%s input_tokens=%d output_tokens=%d",
+                    response.id, response.model, response.stop_reason,
+                    response.usage.input_tokens, response.usage.output_tokens
+                )
 
             return analysis_text
 
         except Exception as e:
-            # Enhanced error logging
-            print(f"\n{'='*60}")
-            print(f"CLAUDE API ERROR")
-            print(f"{'='*60}")
-            print(f"Error type: {type(e).__name__}")
-            print(f"Error message: {str(e)}")
-            print(f"Full error details:")
-            import traceback
-            print(traceback.format_exc())
-            print(f"{'='*60}\n")
-
-            logger.error(f"Error calling Claude API: {str(e)}")
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Full traceback: {traceback.format_exc()}")
+            logger.exception("Error calling Claude API: %s: %s", type(e).__name__, e)
 
             raise Exception(f"Failed to analyze swing: {str(e)}")
 
+    async def analyze_swing_stream(
+        self,
+        images: Dict[str, bytes],
+        positions: List[str],
+        media_types: Dict[str, str] = None,
+        annotation_context: Dict = None,
+        db = None,
+        debug = None
+    ) -> AsyncIterator[str]:
+        """
+        Analyze golf swing using Claude Vision API, yielding text as it is generated.
+        Callers join the chunks and parse the complete text once at the end.
+
+        Args:
+            images: Dictionary mapping position names to raw image bytes
+            positions: List of position names in order
+            media_types: Dictionary mapping position names to media types
+            annotation_context: User-provided context about the swing
+            db: Database session for querying swing history
+
+        Yields:
+            Chunks of analysis text
+        """
+        cache_key = await asyncio.to_thread(
+            self._analysis_cache_key, images, positions, annotation_context, None
+        )
+        cached = self._get_cached_analysis(cache_key)
+        if cached is not None:
+            if debug:
+                debug.log_step(9, "completed", details={"cached": True})
+            yield cached
+            return
+
+        params = await self._build_request(
+            images, positions, media_types, annotation_context, db, debug,
+            use_files=settings.claude_use_files_api
+        )
+
+        if debug:
+            debug.log_step(9, "started", details={
+                "model": self.model,
+                "positions_count": len(positions),
+                "streaming": True
+            })
+
+        messages = self.client.beta.messages if "betas" in params else self.client.messages
+        async with self._semaphore:
+            async with messages.stream(**params) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                response = await stream.get_final_message()
+
+        if debug:
+            debug.log_step(9, "completed", details={
+                "response_id": response.id,
+                "stop_reason": response.stop_reason,
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+                "streaming": True
+            })
+
+        self._cache_analysis(cache_key, response.content[0].text)
+
+    async def analyze_swing_batched(
+        self,
+        images: Dict[str, bytes],
+        positions: List[str],
+        media_types: Dict[str, str] = None,
+        annotation_context: Dict = None,
+        db = None,
+        debug = None
+    ) -> str:
+        """
+        Analyze a golf swing through the Message Batches API.
+        Requests queued within claude_batch_window_seconds are submitted together,
+        and each caller is resolved with its own result once the batch ends.
+        Batches are billed at half price but can take minutes, so this is only
+        for analyses nobody is waiting on interactively.
+
+        Args:
+            images: Dictionary mapping position names to raw image bytes
+            positions: List of position names in order
+            media_types: Dictionary mapping position names to media types
+            annotation_context: User-provided context about the swing
+            db: Database session for querying swing history
+
+        Returns:
+            Analysis text from Claude
+
+        Raises:
+            Exception: If the batch request fails or this analysis errored
+        """
+        params = await self._build_request(images, positions, media_types, annotation_context, db, debug)
+
+        if debug:
+            debug.log_step(9, "started", details={
+                "model": self.model,
+                "positions_count": len(positions),
+                "batched": True
+            })
+
+        future = asyncio.get_running_loop().create_future()
+        self._batch_queue[uuid.uuid4().hex] = (params, future)
+
+        if self._batch_flush is None or self._batch_flush.done():
+            self._batch_flush = asyncio.create_task(self._flush_batch_queue())
+            self._batch_flushes.add(self._batch_flush)
+            self._batch_flush.add_done_callback(self._batch_flushes.discard)
+
+        analysis_text = await future
+
+        if debug:
+            debug.log_step(9, "completed", details={"batched": True})
+
+        return analysis_text
+
+    async def _flush_batch_queue(self):
+        """Wait for the batching window, then submit everything queued as one batch"""
+        await asyncio.sleep(settings.claude_batch_window_seconds)
+
+        queued, self._batch_queue = self._batch_queue, {}
+        # The batch below polls for minutes; anything queued meanwhile starts its own flush
+        self._batch_flush = None
+
+        try:
+            results = await self.analyze_swing_batch({
+                custom_id: params for custom_id, (params, _) in queued.items()
+            })
+        except Exception as e:
+            for _, future in queued.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for custom_id, (_, future) in queued.items():
+            # The caller may have been cancelled while the batch was running
+            if future.done():
+                continue
+            if custom_id in results:
+                future.set_result(results[custom_id])
+            else:
+                future.set_exception(RuntimeError(f"Batch request {custom_id} did not succeed"))
+
+    async def analyze_swing_batch(self, requests: Dict[str, Dict]) -> Dict[str, str]:
+        """
+        Submit analyses as a single Message Batch and wait for it to end.
+
+        Args:
+            requests: Dictionary mapping custom_id to Messages API params (from _build_request)
+
+        Returns:
+            Dictionary mapping custom_id to analysis text, for requests that succeeded
+        """
+        batch = await self.client.messages.batches.create(requests=[
+            {"custom_id": custom_id, "params": params}
+            for custom_id, params in requests.items()
+        ])
+        logger.info("Submitted message batch %s with %d analyses", batch.id, len(requests))
+
+        # Poll with exponential backoff (capped at one minute) until processing ends
+        delay = 5.0
+        while batch.processing_status != "ended":
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+            batch = await self.client.messages.batches.retrieve(batch.id)
+
+        results = {}
+        async for entry in await self.client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = entry.result.message.content[0].text
+            else:
+                logger.error("Batch request %s ended with status: %s", entry.custom_id, entry.result.type)
+
+        logger.info("Message batch %s ended: %d/%d succeeded", batch.id, len(results), len(requests))
+
+        return results
+
     def parse_analysis(self, analysis_text: str) -> tuple:
         """
         Parse Claude's analysis to extract rating and summary.
@@ -282,37 +724,44 @@ Please be specific, constructive, and focus on the most impactful improvements.
         summary = None
 
         try:
-            # Extract rating (look for patterns like "8/10", "Rating: 7", "7 out of 10", etc.)
-            rating_patterns = [
-                r'(?:rate|rating|score).*?(\d+)(?:/10|\s*out\s*of\s*10)',
-                r'(\d+)/10',
-                r'(?:quality|overall).*?(\d+)(?:/10|\s*out\s*of\s*10)',
-            ]
-
-            for pattern in rating_patterns:
-                match = re.search(pattern, analysis_text, re.IGNORECASE)
-                if match:
+            # Isolate the OVERALL ASSESSMENT section so the rating and summary are
+            # searched in a short slice instead of scanning the whole response
+            section = None
+            header = _OVERALL_HEADER.search(analysis_text)
+            if header:
+                section, _, _ = analysis_text[header.end():].partition("\n2.")
+
+            if section:
+                match = _SECTION_RATING.search(section)
+                if match and 1 <= int(match.group(1)) <= 10:
                     rating = int(match.group(1))
-                    if 1 <= rating <= 10:
+
+                # Summary runs from the first bullet to the end of its paragraph
+                _, dash, rest = section.partition("-")
+                if dash:
+                    summary = rest.strip().partition("\n\n")[0] or None
+
+            # Fall back to scanning the full text (look for patterns like "8/10", "Rating: 7", "7 out of 10", etc.)
+            if rating is None:
+                for pattern in _RATING_PATTERNS:
+                    match = pattern.search(analysis_text)
+                    if match:
+                        rating = int(match.group(1))
+                        if 1 <= rating <= 10:
+                            break
+                        else:
+                            rating = None
+
+            if not summary:
+                for pattern in _SUMMARY_PATTERNS:
+                    match = pattern.search(analysis_text)
+                    if match:
+                        summary = match.group(1).strip()
                         break
-                    else:
-                        rating = None
-
-            # Extract summary (look for overall assessment section)
-            summary_patterns = [
-                r'OVERALL ASSESSMENT.*?-\s*(.+?)(?:\n\n|\n2\.)',
-                r'overall.*?summary.*?:\s*(.+?)(?:\n\n|\n)',
-                r'summary.*?:\s*(.+?)(?:\n\n|\n)',
-            ]
-
-            for pattern in summary_patterns:
-                match = re.search(pattern, analysis_text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    summary = match.group(1).strip()
-                    # Limit summary to 500 characters
-                    if len(summary) > 500:
-                        summary = summary[:497] + "..."
-                    break
+
+            # Limit summary to 500 characters
+            if summary and len(summary) > 500:
+                summary = summary[:497] + "..."
 
             # If no summary found, use first 500 chars
             if not summary:
@@ -337,15 +786,7 @@ Please be specific, constructive, and focus on the most impactful improvements.
             Dictionary with test results including success status and details
         """
         try:
-            print(f"\n{'='*60}")
-            print(f"TESTING CLAUDE API CONNECTION")
-            print(f"{'='*60}")
-            print(f"Model: {self.model}")
-            print(f"API Key (first 20 chars): {settings.anthropic_api_key[:20]}...")
-            print(f"Making test request to Claude...")
-            print(f"{'='*60}\n")
-
-            logger.info("Testing Claude API connection")
+            logger.info("Testing Claude API connection with model %s", self.model)
 
             # Make a simple test request
             response = await self.client.messages.create(
@@ -357,18 +798,7 @@ Please be specific, constructive, and focus on the most impactful improvements.
                 }]
             )
 
-            print(f"\n{'='*60}")
-            print(f"TEST SUCCESSFUL")
-            print(f"{'='*60}")
-            print(f"Response ID: {response.id}")
-            print(f"Model: {response.model}")
-            print(f"Stop reason: {response.stop_reason}")
-            print(f"Input tokens: {response.usage.input_tokens}")
-            print(f"Output tokens: {response.usage.output_tokens}")
-            print(f"Response text: {response.content[0].text}")
-            print(f"{'='*60}\n")
-
-            logger.info(f"Test successful - Response ID: {response.id}")
+            logger.info("Test successful - Response ID: %s", response.id)
 
             return {
                 "success": True,
@@ -383,17 +813,7 @@ Please be specific, constructive, and focus on the most impactful improvements.
             }
 
         except Exception as e:
-            print(f"\n{'='*60}")
-            print(f"TEST FAILED")
-            print(f"{'='*60}")
-            print(f"Error type: {type(e).__name__}")
-            print(f"Error message: {str(e)}")
-            print(f"Full error details:")
-            print(traceback.format_exc())
-            print(f"{'='*60}\n")
-
-            logger.error(f"Test failed: {str(e)}")
-            logger.error(f"Error type: {type(e).__name__}")
+            logger.error("Test failed: %s: %s", type(e).__name__, e)
 
             return {
                 "success": False,
@@ -1,22 +1,85 @@
 """Service layer for swing database operations"""
-from typing import List, Optional, Dict
+import asyncio
+import time
+from collections import OrderedDict
+from typing import List, Optional, Dict, Tuple
+import pybase64
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, delete, update, desc, func, case, or_, Row
+from sqlalchemy.orm import undefer
 from app.models.swing import Swing
-from app.models.schemas import SwingHistoryItem
-from app.utils.image_utils import create_thumbnail
+from app.models.schemas import SwingHistoryItem, SwingPosition
+from app.utils.image_utils import create_thumbnail, create_thumbnail_from_bytes
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Compiled once and reused for every history page
+_history_adapter = TypeAdapter(List[SwingHistoryItem])
+
+
+def _encode_for_storage(images: Dict[str, bytes], thumbnail_position: Optional[str]) -> Tuple[Dict[str, str], Optional[str]]:
+    """Base64 encode images for the JSON images column and build the history thumbnail (blocking)"""
+    encoded = {position: pybase64.b64encode_as_string(data) for position, data in images.items()}
+    thumbnail = create_thumbnail_from_bytes(images[thumbnail_position]) if thumbnail_position else None
+    return encoded, thumbnail
+
 
 class SwingService:
     """Service class for swing database operations"""
 
+    # Short-lived in-process cache of the total swing count, so paging through
+    # history doesn't issue a full-table COUNT(*) on every request
+    COUNT_CACHE_TTL_SECONDS = 5.0
+    _count_cache = {"value": None, "timestamp": 0.0}
+
+    # Completed swings never change, so detail lookups and rendered history pages
+    # are cached in-process (LRU) and dropped on create/delete. Entries also
+    # expire, since deletes in other processes can't invalidate this cache.
+    SWING_CACHE_SIZE = 32
+    SWING_CACHE_TTL_SECONDS = 30.0
+    HISTORY_CACHE_SIZE = 64
+    HISTORY_CACHE_TTL_SECONDS = 30.0
+    _swing_cache: "OrderedDict[int, Tuple[float, Swing]]" = OrderedDict()
+    _history_cache: "OrderedDict[Tuple, Tuple[float, List[SwingHistoryItem], int]]" = OrderedDict()
+
+    @classmethod
+    def invalidate_count_cache(cls):
+        """Drop the cached swing count after a create or delete"""
+        cls._count_cache["value"] = None
+
+    @classmethod
+    def invalidate_read_caches(cls, swing_id: Optional[int] = None):
+        """
+        Drop cached reads after a create or delete.
+
+        Args:
+            swing_id: ID of a deleted swing to evict from the detail cache
+        """
+        cls.invalidate_count_cache()
+        cls._history_cache.clear()
+        if swing_id is not None:
+            cls._swing_cache.pop(swing_id, None)
+
+    @classmethod
+    def _get_cached_count(cls) -> Optional[int]:
+        """Return the cached swing count, or None if missing or expired"""
+        cache = cls._count_cache
+        if cache["value"] is not None and time.monotonic() - cache["timestamp"] < cls.COUNT_CACHE_TTL_SECONDS:
+            return cache["value"]
+        return None
+
+    @classmethod
+    def _set_cached_count(cls, count: int):
+        """Store a freshly read swing count"""
+        cls._count_cache["value"] = count
+        cls._count_cache["timestamp"] = time.monotonic()
+
     @staticmethod
     async def create_swing(
         db: AsyncSession,
-        images: Dict[str, str],
+        images: Dict[str, bytes],
         analysis: str,
         positions: List[str],
         rating: Optional[int] = None,
@@ -24,14 +87,15 @@ class SwingService:
         club: Optional[str] = None,
         shot_outcome: Optional[str] = None,
         focus_area: Optional[str] = None,
-        notes: Optional[str] = None
+        notes: Optional[str] = None,
+        status: str = "completed"
     ) -> Swing:
         """
         Create a new swing analysis record in the database.
 
         Args:
             db: Database session
-            images: Dictionary of position -> base64 image
+            images: Dictionary of position -> raw image bytes (stored base64 encoded)
             analysis: Full analysis text from Claude
             positions: List of swing positions analyzed
             rating: Overall rating (1-10)
@@ -40,6 +104,7 @@ class SwingService:
             shot_outcome: Outcome of the shot
             focus_area: What the golfer was working on
             notes: Additional notes
+            status: "pending" to save the swing before its analysis is ready
 
         Returns:
             Created Swing instance
@@ -47,8 +112,13 @@ class SwingService:
         try:
             positions_str = ",".join(positions)
 
+            # Encode images and precompute the history thumbnail in one hop off the event loop
+            thumbnail_position = positions[0] if positions and positions[0] in images else None
+            images_base64, thumbnail = await asyncio.to_thread(_encode_for_storage, images, thumbnail_position)
+
             swing = Swing(
-                images=images,
+                images=images_base64,
+                thumbnail=thumbnail,
                 analysis=analysis,
                 summary=summary,
                 rating=rating,
@@ -56,12 +126,13 @@ class SwingService:
                 club=club,
                 shot_outcome=shot_outcome,
                 focus_area=focus_area,
-                notes=notes
+                notes=notes,
+                status=status
             )
 
             db.add(swing)
             await db.commit()
-            await db.refresh(swing)
+            SwingService.invalidate_read_caches()
 
             logger.info(f"Created swing record with ID: {swing.id}")
 
@@ -72,6 +143,42 @@ class SwingService:
             logger.error(f"Error creating swing record: {str(e)}")
             raise
 
+    @staticmethod
+    async def complete_swing(
+        db: AsyncSession,
+        swing_id: int,
+        analysis: str,
+        rating: Optional[int] = None,
+        summary: Optional[str] = None,
+        status: str = "completed"
+    ):
+        """
+        Store the analysis for a swing created as pending.
+
+        Args:
+            db: Database session
+            swing_id: ID of the pending swing
+            analysis: Full analysis text from Claude (or the error message on failure)
+            rating: Overall rating (1-10)
+            summary: Brief summary text
+            status: "completed", or "failed" if the analysis errored
+        """
+        try:
+            await db.execute(
+                update(Swing)
+                .where(Swing.id == swing_id)
+                .values(analysis=analysis, rating=rating, summary=summary, status=status)
+            )
+            await db.commit()
+            SwingService.invalidate_read_caches(swing_id)
+
+            logger.info(f"Updated swing {swing_id} with status: {status}")
+
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error updating swing {swing_id}: {str(e)}")
+            raise
+
     @staticmethod
     async def get_swing_by_id(db: AsyncSession, swing_id: int) -> Optional[Swing]:
         """
@@ -84,12 +191,28 @@ class SwingService:
         Returns:
             Swing instance or None if not found
         """
+        cache = SwingService._swing_cache
+        cached = cache.get(swing_id)
+        if cached is not None and time.monotonic() - cached[0] < SwingService.SWING_CACHE_TTL_SECONDS:
+            cache.move_to_end(swing_id)
+            return cached[1]
+
         try:
             result = await db.execute(
-                select(Swing).where(Swing.id == swing_id)
+                select(Swing)
+                .options(undefer(Swing.images))
+                .where(Swing.id == swing_id)
             )
             swing = result.scalar_one_or_none()
 
+            # Pending swings change when their analysis lands, possibly in another
+            # process, so only finished swings are cached
+            if swing is not None and swing.status in (None, "completed"):
+                cache[swing_id] = (time.monotonic(), swing)
+                cache.move_to_end(swing_id)
+                if len(cache) > SwingService.SWING_CACHE_SIZE:
+                    cache.popitem(last=False)
+
             return swing
 
         except Exception as e:
@@ -100,38 +223,189 @@ class SwingService:
     async def get_all_swings(
         db: AsyncSession,
         limit: int = 50,
-        offset: int = 0
-    ) -> List[Swing]:
+        offset: int = 0,
+        before_id: Optional[int] = None,
+        with_total: bool = False
+    ) -> List[Row]:
         """
         Get all swing analyses, ordered by most recent first.
 
+        Only the columns needed for the history list are selected, including
+        the precomputed thumbnail. For older swings saved without one, the
+        first uploaded image is extracted database-side instead (positions are
+        always stored in SwingPosition order), so the full images blob never
+        reaches Python.
+
         Args:
             db: Database session
             limit: Maximum number of records to return
-            offset: Number of records to skip
+            offset: Number of records to skip (ignored when before_id is given)
+            before_id: Keyset cursor - only return swings with a lower ID
+            with_total: Also select the total swing count as a `total` column,
+                saving a separate COUNT round-trip
 
         Returns:
-            List of Swing instances
+            List of rows with history columns plus a `first_image` column
+            (only populated when `thumbnail` is missing)
         """
         try:
-            result = await db.execute(
-                select(Swing)
-                .order_by(desc(Swing.created_at))
+            first_image = case(
+                (
+                    Swing.thumbnail.is_(None),
+                    func.coalesce(
+                        *[Swing.images[position.value].as_string() for position in SwingPosition]
+                    )
+                )
+            ).label("first_image")
+
+            stmt = (
+                select(
+                    Swing.id,
+                    Swing.created_at,
+                    Swing.summary,
+                    Swing.rating,
+                    Swing.positions_analyzed,
+                    Swing.club,
+                    Swing.shot_outcome,
+                    Swing.thumbnail,
+                    first_image
+                )
+                .order_by(desc(Swing.id))
                 .limit(limit)
-                .offset(offset)
             )
-            swings = result.scalars().all()
 
-            return list(swings)
+            if with_total:
+                # Uncorrelated scalar subquery - evaluated once, unlike COUNT(*) OVER()
+                # which would force the database to materialize every matching row
+                stmt = stmt.add_columns(
+                    select(func.count()).select_from(Swing).scalar_subquery().label("total")
+                )
+
+            # Keyset pagination walks the primary key index instead of
+            # scanning and discarding `offset` rows
+            if before_id is not None:
+                stmt = stmt.where(Swing.id < before_id)
+            elif offset:
+                stmt = stmt.offset(offset)
+
+            result = await db.execute(stmt)
+
+            return list(result.all())
 
         except Exception as e:
             logger.error(f"Error retrieving swings: {str(e)}")
             raise
 
+    @staticmethod
+    async def get_history_page(
+        db: AsyncSession,
+        limit: int = 50,
+        offset: int = 0,
+        before_id: Optional[int] = None
+    ) -> Tuple[List[Row], int]:
+        """
+        Get one page of swing history along with the total swing count.
+        When the count isn't cached it is fetched in the same query as the page.
+
+        Args:
+            db: Database session
+            limit: Maximum number of records to return
+            offset: Number of records to skip (ignored when before_id is given)
+            before_id: Keyset cursor - only return swings with a lower ID
+
+        Returns:
+            Tuple of (rows from get_all_swings, total swing count)
+        """
+        total = SwingService._get_cached_count()
+        rows = await SwingService.get_all_swings(
+            db, limit=limit, offset=offset, before_id=before_id, with_total=total is None
+        )
+
+        if total is None:
+            if rows:
+                total = rows[0].total
+                SwingService._set_cached_count(total)
+            else:
+                # Past the last page - no row to carry the count
+                total = await SwingService.get_swing_count(db)
+
+        return rows, total
+
+    @staticmethod
+    async def get_history_items(
+        db: AsyncSession,
+        limit: int = 50,
+        offset: int = 0,
+        before_id: Optional[int] = None
+    ) -> Tuple[List[SwingHistoryItem], int]:
+        """
+        Get one page of swing history as response items along with the total count.
+        Rendered pages are cached for a short time and dropped on create/delete.
+
+        Args:
+            db: Database session
+            limit: Maximum number of records to return
+            offset: Number of records to skip (ignored when before_id is given)
+            before_id: Keyset cursor - only return swings with a lower ID
+
+        Returns:
+            Tuple of (SwingHistoryItem list, total swing count)
+        """
+        cache = SwingService._history_cache
+        key = (limit, offset, before_id)
+
+        cached = cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < SwingService.HISTORY_CACHE_TTL_SECONDS:
+            cache.move_to_end(key)
+            return cached[1], cached[2]
+
+        rows, total = await SwingService.get_history_page(db, limit=limit, offset=offset, before_id=before_id)
+        items = await SwingService.swings_to_history_items(rows)
+
+        # Persist thumbnails created for older swings so each is only built once
+        # (skipping failures and already-small images, where create_thumbnail
+        # returns the original image)
+        backfill = {
+            item.id: item.thumbnail
+            for row, item in zip(rows, items)
+            if not row.thumbnail and item.thumbnail and item.thumbnail != row.first_image
+        }
+        if backfill:
+            await SwingService._backfill_thumbnails(db, backfill)
+
+        cache[key] = (time.monotonic(), items, total)
+        cache.move_to_end(key)
+        if len(cache) > SwingService.HISTORY_CACHE_SIZE:
+            cache.popitem(last=False)
+
+        return items, total
+
+    @staticmethod
+    async def _backfill_thumbnails(db: AsyncSession, thumbnails: Dict[int, str]):
+        """
+        Store thumbnails for swings saved before thumbnails were persisted.
+        Failures are logged and ignored - the thumbnail is simply rebuilt next time.
+
+        Args:
+            db: Database session
+            thumbnails: Dictionary of swing ID -> base64 thumbnail
+        """
+        try:
+            await db.execute(
+                update(Swing),
+                [{"id": swing_id, "thumbnail": thumbnail} for swing_id, thumbnail in thumbnails.items()]
+            )
+            await db.commit()
+            logger.info(f"Backfilled thumbnails for {len(thumbnails)} swing(s)")
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Error backfilling thumbnails: {str(e)}")
+
     @staticmethod
     async def get_swing_count(db: AsyncSession) -> int:
         """
         Get total count of swing analyses.
+        Served from a short-lived cache that is invalidated on create/delete.
 
         Args:
             db: Database session
@@ -139,14 +413,19 @@ class SwingService:
         Returns:
             Total count of swings
         """
+        cached = SwingService._get_cached_count()
+        if cached is not None:
+            return cached
+
         try:
-            from sqlalchemy import func
             result = await db.execute(
                 select(func.count()).select_from(Swing)
             )
-            count = result.scalar()
+            count = result.scalar() or 0
 
-            return count or 0
+            SwingService._set_cached_count(count)
+
+            return count
 
         except Exception as e:
             logger.error(f"Error counting swings: {str(e)}")
@@ -162,17 +441,20 @@ class SwingService:
             swing_id: ID of the swing to delete
 
         Returns:
-            True if deleted successfully
+            True if deleted successfully, False if no swing had that ID
         """
         try:
+            # Single DELETE ... RETURNING round-trip instead of SELECT then DELETE
             result = await db.execute(
-                select(Swing).where(Swing.id == swing_id)
+                delete(Swing)
+                .where(Swing.id == swing_id)
+                .returning(Swing.id)
             )
-            swing = result.scalar_one_or_none()
+            deleted_id = result.scalar_one_or_none()
+            await db.commit()
 
-            if swing:
-                await db.delete(swing)
-                await db.commit()
+            if deleted_id is not None:
+                SwingService.invalidate_read_caches(swing_id)
                 logger.info(f"Deleted swing record with ID: {swing_id}")
                 return True
 
@@ -184,7 +466,7 @@ class SwingService:
             raise
 
     @staticmethod
-    async def get_recent_swings(db: AsyncSession, limit: int = 3) -> List[Swing]:
+    async def get_recent_swings(db: AsyncSession, limit: int = 3) -> List[Row]:
         """
         Get most recent swing analyses for comparison.
 
@@ -192,52 +474,59 @@ class SwingService:
             db: Database session
             limit: Number of recent swings to retrieve (default: 3)
 
+        Only the columns used in the prompt's history section are selected, as
+        plain rows without ORM hydration; the full analysis text and images stay
+        in the database. Pending and failed swings are skipped.
+
         Returns:
-            List of recent Swing instances
+            List of rows with id, created_at, summary, rating, club and shot_outcome
         """
         try:
             result = await db.execute(
-                select(Swing)
+                select(
+                    Swing.id,
+                    Swing.created_at,
+                    Swing.summary,
+                    Swing.rating,
+                    Swing.club,
+                    Swing.shot_outcome
+                )
+                .where(or_(Swing.status.is_(None), Swing.status == "completed"))
                 .order_by(desc(Swing.created_at))
                 .limit(limit)
             )
-            swings = result.scalars().all()
-            return list(swings)
+            return list(result.all())
         except Exception as e:
             logger.error(f"Error retrieving recent swings: {str(e)}")
             return []
 
     @staticmethod
-    def swing_to_history_item(swing: Swing) -> SwingHistoryItem:
+    async def swings_to_history_items(rows: List[Row]) -> List[SwingHistoryItem]:
         """
-        Convert a Swing model to a SwingHistoryItem response.
-        Creates a thumbnail from the first available image.
+        Convert projected history rows to SwingHistoryItem responses.
+        Uses the stored thumbnail, creating one from the first available image
+        for older swings, and validates the whole page in one pass with a shared TypeAdapter.
 
         Args:
-            swing: Swing database model
+            rows: Rows returned by get_all_swings
 
         Returns:
-            SwingHistoryItem schema
-        """
-        # Get first image as thumbnail
-        thumbnail = None
-        if swing.images:
-            # Get the first available image
-            first_position = swing.positions_analyzed.split(',')[0]
-            if first_position in swing.images:
-                # Create thumbnail from first image
-                thumbnail = create_thumbnail(swing.images[first_position])
-
-        return SwingHistoryItem(
-            id=swing.id,
-            created_at=swing.created_at,
-            summary=swing.summary,
-            rating=swing.rating,
-            positions_analyzed=swing.positions_analyzed,
-            thumbnail=thumbnail,
-            club=swing.club,
-            shot_outcome=swing.shot_outcome
-        )
+            List of SwingHistoryItem schemas
+        """
+        # Swings saved without a thumbnail get one created concurrently, off the event loop
+        missing = [row for row in rows if not row.thumbnail and row.first_image]
+        created = await asyncio.gather(*[
+            asyncio.to_thread(create_thumbnail, row.first_image) for row in missing
+        ])
+        thumbnails = {row.id: thumbnail for row, thumbnail in zip(missing, created)}
+
+        return _history_adapter.validate_python([
+            {
+                **row._mapping,
+                "thumbnail": row.thumbnail or thumbnails.get(row.id)
+            }
+            for row in rows
+        ])
 
 
 # Global instance
@@ -2,13 +2,27 @@
 import logging
 import time
 import uuid
-from typing import Dict, List, Optional, Any
-from datetime import datetime
-import json
-from collections import deque
+from typing import Dict, List, Optional, Any, Tuple
+from datetime import datetime, timedelta
+import orjson
+import sys
+from collections import OrderedDict
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+def _dumps(details: Dict[str, Any]) -> str:
+    """Pretty-print step details for the console (orjson only supports 2-space indents)"""
+    return orjson.dumps(details, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+
+# Console prefix per step status, built once rather than per log_step call
+_STATUS_SYMBOL = {
+    "started": "▶",
+    "completed": "✓",
+    "failed": "✗"
+}
+
 
 class DebugLogger:
     """
@@ -16,8 +30,11 @@ class DebugLogger:
     Stores recent debug sessions in memory for easy viewing.
     """
 
-    # Store last 50 debug sessions
-    _recent_sessions = deque(maxlen=50)
+    # Store last 50 debug sessions, keyed by request ID in the order they finished
+    MAX_SESSIONS = 50
+    # Repeats of the same step and status within this window are dropped
+    DUPLICATE_WINDOW_SECONDS = 5.0
+    _recent_sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
 
     STEPS = {
         1: "User uploads images",
@@ -40,26 +57,40 @@ class DebugLogger:
     def __init__(self, request_id: Optional[str] = None):
         """Initialize debug logger with unique request ID"""
         self.request_id = request_id or str(uuid.uuid4())
-        self.start_time = time.time()
+        # The wall clock is read once; step timestamps are derived from the
+        # monotonic elapsed time, which also drives all durations
+        self.start_time = time.monotonic()
+        self._start_wall = datetime.now()
         self.steps: List[Dict[str, Any]] = []
         self.errors: List[Dict[str, Any]] = []
         self.metadata: Dict[str, Any] = {
             "request_id": self.request_id,
-            "start_time": datetime.now().isoformat(),
+            "start_time": self._start_wall.isoformat(),
             "steps_completed": 0,
             "total_duration_ms": 0,
             "status": "in_progress"
         }
 
-        # Print header
-        print(f"\n{'='*80}")
-        print(f"DEBUG SESSION STARTED")
-        print(f"{'='*80}")
-        print(f"Request ID: {self.request_id}")
-        print(f"Timestamp: {self.metadata['start_time']}")
-        print(f"{'='*80}\n")
+        # Console output is only rendered in debug mode; it is buffered and
+        # written once in finalize() instead of issuing several writes per step
+        self._verbose = settings.debug_mode
+        self._output: List[str] = []
 
-        logger.info(f"[DEBUG:{self.request_id}] Session started")
+        # When each (step_number, status) was last logged, for duplicate suppression
+        self._last_seen: Dict[Tuple[int, str], float] = {}
+
+        # Buffer header
+        if self._verbose:
+            self._output.extend([
+                f"\n{'='*80}",
+                "DEBUG SESSION STARTED",
+                f"{'='*80}",
+                f"Request ID: {self.request_id}",
+                f"Timestamp: {self.metadata['start_time']}",
+                f"{'='*80}\n"
+            ])
+
+        logger.info("[DEBUG:%s] Session started", self.request_id)
 
     def log_step(
         self,
@@ -77,14 +108,23 @@ class DebugLogger:
             details: Additional information about the step
             error: Error message if step failed
         """
-        current_time = time.time()
-        duration_ms = int((current_time - self.start_time) * 1000)
+        now = time.monotonic()
+
+        # Drop repeats (e.g. from a retry loop) so an error cascade can't flood the log
+        key = (step_number, status)
+        last_seen = self._last_seen.get(key)
+        if last_seen is not None and now - last_seen < self.DUPLICATE_WINDOW_SECONDS:
+            return
+        self._last_seen[key] = now
+
+        elapsed = now - self.start_time
+        duration_ms = int(elapsed * 1000)
 
         step_info = {
             "step_number": step_number,
             "step_name": self.STEPS.get(step_number, f"Unknown step {step_number}"),
             "status": status,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": (self._start_wall + timedelta(seconds=elapsed)).isoformat(),
             "duration_from_start_ms": duration_ms,
             "details": details or {},
             "error": error
@@ -97,30 +137,36 @@ class DebugLogger:
             self.metadata["steps_completed"] = step_number
 
         # Print step info
-        status_symbol = {
-            "started": "▶",
-            "completed": "✓",
-            "failed": "✗"
-        }.get(status, "•")
+        if self._verbose:
+            status_symbol = _STATUS_SYMBOL.get(status, "•")
 
-        print(f"{status_symbol} Step {step_number}: {step_info['step_name']}")
-        print(f"  Status: {status.upper()}")
-        print(f"  Duration from start: {duration_ms}ms")
+            self._output.append(f"{status_symbol} Step {step_number}: {step_info['step_name']}")
+            self._output.append(f"  Status: {status.upper()}")
+            self._output.append(f"  Duration from start: {duration_ms}ms")
 
-        if details:
-            print(f"  Details: {json.dumps(details, indent=4)}")
+            if details:
+                self._output.append(f"  Details: {_dumps(details)}")
 
-        if error:
-            print(f"  ERROR: {error}")
+            if error:
+                self._output.append(f"  ERROR: {error}")
+
+            self._output.append("")
 
-        print()
+            # Failures are flushed right away so they're visible even if the request never finalizes
+            if status == "failed":
+                self._flush()
 
-        # Log to file
-        log_msg = f"[DEBUG:{self.request_id}] Step {step_number} ({status}): {step_info['step_name']}"
+        # Log to file (%-style, so messages are only formatted if a handler emits them)
         if error:
-            logger.error(f"{log_msg} - ERROR: {error}")
+            logger.error(
+                "[DEBUG:%s] Step %d (%s): %s - ERROR: %s",
+                self.request_id, step_number, status, step_info['step_name'], error
+            )
         else:
-            logger.info(log_msg)
+            logger.info(
+                "[DEBUG:%s] Step %d (%s): %s",
+                self.request_id, step_number, status, step_info['step_name']
+            )
 
         # If step failed, record error
         if status == "failed" and error:
@@ -133,32 +179,41 @@ class DebugLogger:
 
     def finalize(self, success: bool = True):
         """Finalize the debug session"""
-        end_time = time.time()
-        total_duration = int((end_time - self.start_time) * 1000)
+        elapsed = time.monotonic() - self.start_time
+        total_duration = int(elapsed * 1000)
 
         self.metadata["status"] = "success" if success else "failed"
         self.metadata["total_duration_ms"] = total_duration
-        self.metadata["end_time"] = datetime.now().isoformat()
+        self.metadata["end_time"] = (self._start_wall + timedelta(seconds=elapsed)).isoformat()
         self.metadata["error_count"] = len(self.errors)
 
-        # Print summary
-        print(f"\n{'='*80}")
-        print(f"DEBUG SESSION ENDED")
-        print(f"{'='*80}")
-        print(f"Request ID: {self.request_id}")
-        print(f"Status: {self.metadata['status'].upper()}")
-        print(f"Steps Completed: {self.metadata['steps_completed']}/15")
-        print(f"Total Duration: {total_duration}ms")
-        print(f"Errors: {len(self.errors)}")
-
-        if self.errors:
-            print(f"\nERRORS ENCOUNTERED:")
-            for err in self.errors:
-                print(f"  • Step {err['step']}: {err['error']}")
-
-        print(f"{'='*80}\n")
-
-        logger.info(f"[DEBUG:{self.request_id}] Session ended - Status: {self.metadata['status']}, Duration: {total_duration}ms")
+        # Buffer summary
+        if self._verbose:
+            self._output.extend([
+                f"\n{'='*80}",
+                "DEBUG SESSION ENDED",
+                f"{'='*80}",
+                f"Request ID: {self.request_id}",
+                f"Status: {self.metadata['status'].upper()}",
+                f"Steps Completed: {self.metadata['steps_completed']}/15",
+                f"Total Duration: {total_duration}ms",
+                f"Errors: {len(self.errors)}"
+            ])
+
+            if self.errors:
+                self._output.append("\nERRORS ENCOUNTERED:")
+                for err in self.errors:
+                    self._output.append(f"  • Step {err['step']}: {err['error']}")
+
+            self._output.append(f"{'='*80}\n")
+
+            # Single write for the whole session
+            self._flush()
+
+        logger.info(
+            "[DEBUG:%s] Session ended - Status: %s, Duration: %dms",
+            self.request_id, self.metadata['status'], total_duration
+        )
 
         # Store session for later retrieval
         session_data = {
@@ -166,7 +221,19 @@ class DebugLogger:
             "steps": self.steps,
             "errors": self.errors
         }
-        self._recent_sessions.append(session_data)
+        # A retried request ID replaces its earlier session and moves to the end
+        sessions = self._recent_sessions
+        sessions[self.request_id] = session_data
+        sessions.move_to_end(self.request_id)
+        if len(sessions) > self.MAX_SESSIONS:
+            sessions.popitem(last=False)
+
+    def _flush(self):
+        """Write all buffered console output in a single call"""
+        if self._output:
+            sys.stdout.write("\n".join(self._output) + "\n")
+            sys.stdout.flush()
+            self._output.clear()
 
     def get_summary(self) -> Dict[str, Any]:
         """Get a summary of the debug session"""
@@ -179,13 +246,10 @@ class DebugLogger:
     @classmethod
     def get_recent_sessions(cls, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent debug sessions"""
-        sessions = list(cls._recent_sessions)
+        sessions = list(cls._recent_sessions.values())
         return sessions[-limit:]
 
     @classmethod
     def get_session_by_id(cls, request_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific session by request ID"""
-        for session in cls._recent_sessions:
-            if session["metadata"]["request_id"] == request_id:
-                return session
-        return None
+        return cls._recent_sessions.get(request_id)
@@ -1,140 +1,203 @@
 """Image handling utilities for validation and conversion"""
-import base64
+import hashlib
 import io
-from typing import Tuple
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+import pybase64
 from PIL import Image
 from fastapi import UploadFile, HTTPException
 from app.config import settings
 
+# Formats PIL is asked to try when opening images (the ones _media_type maps),
+# so it doesn't probe every registered plugin for each image
+_PIL_FORMATS = ("JPEG", "PNG", "WEBP", "GIF")
 
-async def validate_image(file: UploadFile) -> None:
+# Errors PIL raises for files it can't identify or won't open (UnidentifiedImageError
+# is an OSError), plus the ValueError raised for formats that aren't allowed
+_INVALID_IMAGE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+# Register just the plugins for those formats at import, rather than all of
+# PIL's decoders (Image.init) or lazily on the first request
+Image.preinit()
+from PIL import WebPImagePlugin  # noqa: E402,F401 - registers WEBP
+
+
+async def validate_and_read_image(file: UploadFile) -> Tuple[bytes, str]:
     """
-    Validate uploaded image file.
+    Validate an uploaded image and return its raw bytes along with its media type.
+    Images stay as bytes through the pipeline and are base64 encoded only where
+    a string is required (the Claude request and the stored swing record).
+    Only the image header is parsed, which is cheap enough to do on the event loop.
 
     Args:
         file: Uploaded file from FastAPI
 
+    Returns:
+        Tuple of (image_bytes, media_type)
+
     Raises:
         HTTPException: If validation fails
     """
+    content = await _read_upload(file)
+
+    try:
+        return content, _verify_and_detect(content, file.content_type)
+    except _INVALID_IMAGE_ERRORS as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid image file: {str(e)}"
+        )
+
+
+async def _read_upload(file: UploadFile) -> bytes:
+    """
+    Check an upload's content type and size, reading it exactly once.
+
+    Raises:
+        HTTPException: If the format isn't allowed or the file is too large
+    """
     # Check content type
-    if file.content_type not in settings.allowed_image_formats:
+    if file.content_type not in settings.allowed_formats:
         raise HTTPException(
             status_code=400,
             detail=f"Invalid image format. Allowed formats: {', '.join(settings.allowed_image_formats)}"
         )
 
+    # Reject oversized files from their known size before reading them into memory
+    # (Starlette records the size while spooling the part; a part's own
+    # Content-Length header is used if a client sends one)
+    declared = file.size
+    if declared is None and file.headers.get("content-length", "").isdigit():
+        declared = int(file.headers["content-length"])
+    if declared is not None:
+        _check_size(declared)
+
     # Read file to check size
     content = await file.read()
-    size_mb = len(content) / (1024 * 1024)
+    _check_size(len(content))
 
-    if size_mb > settings.max_image_size_mb:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Image size ({size_mb:.2f}MB) exceeds maximum allowed size ({settings.max_image_size_mb}MB)"
-        )
+    return content
 
-    # Reset file pointer for later reading
-    await file.seek(0)
 
-    # Try to open with PIL to verify it's a valid image
-    try:
-        image = Image.open(io.BytesIO(content))
-        image.verify()
-    except Exception as e:
+def _check_size(size_bytes: int) -> None:
+    """Raise if an image is larger than max_image_size_mb"""
+    size_mb = size_bytes / (1024 * 1024)
+
+    if size_mb > settings.max_image_size_mb:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid image file: {str(e)}"
+            detail=f"Image size ({size_mb:.2f}MB) exceeds maximum allowed size ({settings.max_image_size_mb}MB)"
         )
 
-    # Reset file pointer again
-    await file.seek(0)
 
-
-async def image_to_base64(file: UploadFile) -> str:
+def _verify_and_detect(content: bytes, content_type: Optional[str]) -> str:
     """
-    Convert uploaded image file to base64 string.
+    Identify image bytes with PIL and detect their media type.
+    Image.open only parses the header, so no pixel data is decoded; the
+    detected format (not the upload's content type) must be an allowed one.
 
     Args:
-        file: Uploaded file from FastAPI
+        content: Raw image bytes
+        content_type: Content type reported by the upload, used as a fallback
 
     Returns:
-        Base64 encoded string of the image
+        Media type string
+
+    Raises:
+        ValueError: If the image format isn't allowed
     """
-    content = await file.read()
-    base64_encoded = base64.b64encode(content).decode('utf-8')
+    image = Image.open(io.BytesIO(content), formats=_PIL_FORMATS)
+    image_format = image.format.upper() if image.format else None
 
-    # Reset file pointer
-    await file.seek(0)
+    media_type = _media_type(image_format, content_type)
+    if media_type not in settings.allowed_formats:
+        raise ValueError(f"unsupported image format {image_format}")
 
-    return base64_encoded
+    return media_type
 
 
-async def image_to_base64_with_type(file: UploadFile) -> Tuple[str, str]:
-    """
-    Convert uploaded image file to base64 string along with its media type.
+# Media types for the PIL formats in _PIL_FORMATS
+_FORMAT_MEDIA_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
 
-    Args:
-        file: Uploaded file from FastAPI
+# Content types that have a canonical spelling; others are passed through unchanged
+_CANONICAL_CONTENT_TYPES = {
+    "image/jpg": "image/jpeg",
+}
 
-    Returns:
-        Tuple of (base64_encoded_string, media_type)
-    """
-    content = await file.read()
-    base64_encoded = base64.b64encode(content).decode('utf-8')
 
-    # Detect actual image format from file content using PIL
-    try:
-        image = Image.open(io.BytesIO(content))
-        image_format = image.format.upper() if image.format else None
-
-        # Map PIL format to media type
-        if image_format == 'JPEG':
-            media_type = "image/jpeg"
-        elif image_format == 'PNG':
-            media_type = "image/png"
-        elif image_format == 'WEBP':
-            media_type = "image/webp"
-        elif image_format == 'GIF':
-            media_type = "image/gif"
-        else:
-            # Fallback to content_type from upload
-            content_type = file.content_type or "image/jpeg"
-            if content_type in ["image/jpg", "image/jpeg"]:
-                media_type = "image/jpeg"
-            else:
-                media_type = content_type
-    except Exception:
-        # If PIL fails, fall back to content_type
-        content_type = file.content_type or "image/jpeg"
-        if content_type in ["image/jpg", "image/jpeg"]:
-            media_type = "image/jpeg"
-        else:
-            media_type = content_type
+def _media_type(image_format: Optional[str], content_type: Optional[str]) -> str:
+    """Map a PIL format to a media type, falling back to the upload's content type"""
+    media_type = _FORMAT_MEDIA_TYPES.get(image_format)
+    if media_type is not None:
+        return media_type
+
+    content_type = content_type or "image/jpeg"
+    return _CANONICAL_CONTENT_TYPES.get(content_type, content_type)
+
 
-    # Reset file pointer
-    await file.seek(0)
+# Longest edge of images sent to Claude Vision; token cost scales with pixel count
+VISION_MAX_EDGE = 1024
 
-    return base64_encoded, media_type
 
+# Recently downscaled images keyed by the sha256 of the upload, so repeat
+# submissions skip the resize; only the (small) JPEG output is kept
+VISION_CACHE_SIZE = 8
+_vision_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_vision_cache_lock = threading.Lock()
 
-def get_image_media_type(file: UploadFile) -> str:
+
+def preprocess_for_vision(image_bytes: bytes, media_type: str) -> Tuple[bytes, str]:
     """
-    Get the media type for the image (for Claude API).
+    Downscale an image for Claude Vision and re-encode it as JPEG.
+    Images already within VISION_MAX_EDGE are returned as-is, since Vision
+    tokens depend on pixel count rather than encoding.
+    Blocking - run in a worker thread.
 
     Args:
-        file: Uploaded file from FastAPI
+        image_bytes: Raw image bytes
+        media_type: Media type of the image
 
     Returns:
-        Media type string (e.g., 'image/jpeg', 'image/png')
+        Tuple of (image_bytes, media_type)
     """
-    content_type = file.content_type or "image/jpeg"
+    try:
+        image = Image.open(io.BytesIO(image_bytes), formats=_PIL_FORMATS)
+
+        if max(image.size) <= VISION_MAX_EDGE:
+            return image_bytes, media_type
+
+        key = hashlib.sha256(image_bytes).hexdigest()
+        with _vision_cache_lock:
+            cached = _vision_cache.get(key)
+            if cached is not None:
+                _vision_cache.move_to_end(key)
+                return cached, "image/jpeg"
+
+        # Let libjpeg decode at a reduced scale before resampling
+        image.draft("RGB", (VISION_MAX_EDGE, VISION_MAX_EDGE))
+        image.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=85)
+        resized = buffer.getvalue()
 
-    # Normalize jpeg variations
-    if content_type in ["image/jpg", "image/jpeg"]:
-        return "image/jpeg"
+        with _vision_cache_lock:
+            _vision_cache[key] = resized
+            if len(_vision_cache) > VISION_CACHE_SIZE:
+                _vision_cache.popitem(last=False)
 
-    return content_type
+        return resized, "image/jpeg"
+    except Exception:
+        # If preprocessing fails, send the original image
+        return image_bytes, media_type
 
 
 def create_thumbnail(base64_image: str, max_size: Tuple[int, int] = (200, 200)) -> str:
@@ -146,27 +209,70 @@ def create_thumbnail(base64_image: str, max_size: Tuple[int, int] = (200, 200))
         max_size: Maximum dimensions for thumbnail (width, height)
 
     Returns:
-        Base64 encoded thumbnail string
+        Base64 encoded thumbnail string (the original if it already fits max_size)
     """
     try:
-        # Decode base64 to image
-        image_data = base64.b64decode(base64_image)
-        image = Image.open(io.BytesIO(image_data))
-
-        # Create thumbnail
-        image.thumbnail(max_size, Image.Resampling.LANCZOS)
-
-        # Convert back to base64
-        buffer = io.BytesIO()
-        image.save(buffer, format=image.format or 'JPEG')
-        thumbnail_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-
-        return thumbnail_base64
+        thumbnail = _thumbnail_bytes(pybase64.b64decode(base64_image), max_size)
+        if thumbnail is None:
+            return base64_image
+        return pybase64.b64encode_as_string(thumbnail)
     except Exception as e:
         # If thumbnail creation fails, return original image
         return base64_image
 
 
+def create_thumbnail_from_bytes(image_bytes: bytes, max_size: Tuple[int, int] = (200, 200)) -> Optional[str]:
+    """
+    Create a thumbnail from raw image bytes, skipping the base64 decode.
+
+    Args:
+        image_bytes: Raw image bytes
+        max_size: Maximum dimensions for thumbnail (width, height)
+
+    Returns:
+        Base64 encoded thumbnail string, or None if thumbnail creation fails
+    """
+    try:
+        thumbnail = _thumbnail_bytes(image_bytes, max_size)
+        return pybase64.b64encode_as_string(image_bytes if thumbnail is None else thumbnail)
+    except Exception:
+        return None
+
+
+def _thumbnail_bytes(image_bytes: bytes, max_size: Tuple[int, int]) -> Optional[bytes]:
+    """
+    Resize image bytes to a JPEG thumbnail (blocking - run in a worker thread).
+
+    Returns:
+        JPEG bytes, or None if the image is already a JPEG that fits max_size
+        and can be used as-is
+    """
+    image = Image.open(io.BytesIO(image_bytes), formats=_PIL_FORMATS)
+
+    # Image.open only parsed the header, so small JPEGs skip decoding entirely;
+    # small PNG/WebP images fall through and are re-encoded so the stored
+    # thumbnail is always JPEG
+    if image.format == "JPEG" and image.width <= max_size[0] and image.height <= max_size[1]:
+        return None
+
+    # Create thumbnail (Pillow's draft mode lets libjpeg-turbo decode JPEGs
+    # at a reduced DCT scale, so full-resolution pixels are never materialized)
+    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    # The frontend renders thumbnails as JPEG, so always encode JPEG at a
+    # quality suited to small previews (smaller and faster than PNG)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=75)
+
+    return buffer.getvalue()
+
+
+_VALID_POSITIONS = frozenset(('address', 'top', 'impact', 'follow_through'))
+
+
 def validate_swing_position(position: str) -> bool:
     """
     Validate if the position name is valid.
@@ -177,5 +283,4 @@ def validate_swing_position(position: str) -> bool:
     Returns:
         True if valid, False otherwise
     """
-    valid_positions = ['address', 'top', 'impact', 'follow_through']
-    return position.lower() in valid_positions
+    return position.lower() in _VALID_POSITIONS
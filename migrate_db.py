@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 """
 Database migration script to add annotation fields to swings table.
-Run this once to add the new columns: club, shot_outcome, focus_area, notes
+Run this once to add the new columns: club, shot_outcome, focus_area, notes,
+thumbnail and the created_at index used for history pagination.
 """
 import sqlite3
 import os
 
+# Stored in PRAGMA user_version once a migration completes, so re-runs can skip
+# the schema inspection. Bump it whenever a column or index is added below.
+SCHEMA_VERSION = 1
+
 def migrate_database():
     """Add new columns to swings table for shot annotation."""
     db_path = "golf_coach.db"
@@ -18,6 +23,12 @@ def migrate_database():
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
+    cursor.execute("PRAGMA user_version")
+    if cursor.fetchone()[0] >= SCHEMA_VERSION:
+        print("✓ Database is already up to date. No migration needed.")
+        conn.close()
+        return
+
     # Check if columns already exist
     cursor.execute("PRAGMA table_info(swings)")
     columns = [column[1] for column in cursor.fetchall()]
@@ -27,14 +38,23 @@ def migrate_database():
         'club': 'VARCHAR(100)',
         'shot_outcome': 'VARCHAR(50)',
         'focus_area': 'TEXT',
-        'notes': 'TEXT'
+        'notes': 'TEXT',
+        'thumbnail': 'TEXT',
+        'status': 'VARCHAR(20)'
     }
 
     for col_name, col_type in new_columns.items():
         if col_name not in columns:
             migrations_needed.append((col_name, col_type))
 
-    if not migrations_needed:
+    # Check if the created_at index already exists
+    cursor.execute("PRAGMA index_list(swings)")
+    indexes = [index[1] for index in cursor.fetchall()]
+    index_needed = 'ix_swings_created_at' not in indexes
+
+    if not migrations_needed and not index_needed:
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
         print("✓ Database is already up to date. No migration needed.")
         conn.close()
         return
@@ -42,11 +62,20 @@ def migrate_database():
     print(f"Migrating database: Adding {len(migrations_needed)} new column(s)...")
 
     try:
+        # One transaction for all changes: sqlite3 otherwise autocommits each
+        # ALTER TABLE separately (one journal sync per statement)
+        cursor.execute("BEGIN IMMEDIATE")
+
         for col_name, col_type in migrations_needed:
             sql = f"ALTER TABLE swings ADD COLUMN {col_name} {col_type}"
             print(f"  - Adding column '{col_name}' ({col_type})")
             cursor.execute(sql)
 
+        if index_needed:
+            print("  - Adding index 'ix_swings_created_at' (created_at DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS ix_swings_created_at ON swings (created_at DESC)")
+
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
         print("✓ Migration completed successfully!")
 
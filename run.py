@@ -1,4 +1,5 @@
 """Simple script to run the Golf Coach API server"""
+import sys
 import uvicorn
 from app.config import settings
 
@@ -19,5 +20,9 @@ if __name__ == "__main__":
         host=settings.api_host,
         port=settings.api_port,
         reload=settings.debug_mode,
-        log_level="info" if settings.debug_mode else "warning"
+        log_level="info" if settings.debug_mode else "warning",
+        # C-accelerated event loop and HTTP parser from uvicorn[standard]
+        # (uvloop doesn't support Windows)
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
     )
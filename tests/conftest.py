@@ -0,0 +1,8 @@
+"""Shared test configuration: point the app at a throwaway SQLite database"""
+import os
+import tempfile
+
+# Settings are read when app modules are imported, so configure them first
+_db_dir = tempfile.mkdtemp(prefix="golf-coach-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
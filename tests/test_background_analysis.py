@@ -0,0 +1,88 @@
+"""Background (202) analysis returns before the Claude call finishes"""
+import asyncio
+import io
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+from PIL import Image
+
+from app.main import app
+from app.services.claude_service import claude_service
+from app.services.swing_service import SwingService
+
+ANALYSIS_SECONDS = 2.0
+ANALYSIS_TEXT = "1. OVERALL ASSESSMENT\n   - Rating: 7/10\n   - Solid swing.\n\n2. POSITION ANALYSIS\n..."
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _jpeg() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (300, 300), (40, 120, 40)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def server_url(monkeypatch):
+    """Serve the app over real HTTP, so response timing includes all middleware"""
+    async def slow_analysis(*args, **kwargs):
+        await asyncio.sleep(ANALYSIS_SECONDS)
+        return ANALYSIS_TEXT
+
+    monkeypatch.setattr(claude_service, "analyze_swing", slow_analysis)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.05)
+
+    yield f"http://127.0.0.1:{port}"
+
+    server.should_exit = True
+    thread.join(timeout=10)
+
+
+def test_background_analysis_returns_202_before_analysis_finishes(server_url):
+    started = time.monotonic()
+    response = httpx.post(
+        f"{server_url}/api/swings/analyze",
+        files={"address": ("address.jpg", _jpeg(), "image/jpeg")},
+        data={"background": "true"},
+        timeout=30
+    )
+    elapsed = time.monotonic() - started
+
+    assert response.status_code == 202
+    assert response.json()["status"] == "pending"
+    assert elapsed < ANALYSIS_SECONDS / 2
+
+    # The pending swing is served from the database, not cached
+    swing_id = response.json()["swing_id"]
+    pending = httpx.get(f"{server_url}/api/swings/{swing_id}", timeout=10)
+    assert pending.json()["status"] == "pending"
+    assert swing_id not in SwingService._swing_cache
+
+    # The analysis still completes after the response was sent
+    deadline = time.monotonic() + ANALYSIS_SECONDS + 10
+    while True:
+        swing = httpx.get(f"{server_url}/api/swings/{swing_id}", timeout=10).json()
+        if swing["status"] != "pending":
+            break
+        assert time.monotonic() < deadline, "background analysis never completed"
+        time.sleep(0.2)
+
+    assert swing["status"] == "completed"
+    assert swing["rating"] == 7